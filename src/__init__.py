@@ -0,0 +1 @@
+"""Claude Code conversation monitor."""
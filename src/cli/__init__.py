@@ -0,0 +1,5 @@
+"""Command-line interface for the conversation monitor."""
+
+from src.cli.main import build_parser, main
+
+__all__ = ["build_parser", "main"]
@@ -0,0 +1,176 @@
+"""``ccmonitor`` command-line entry point.
+
+Session metadata always comes from the on-disk :class:`SessionIndex`; raw
+logs are only read for files that changed since they were last indexed.
+
+``--profile`` turns on the stage instrumentation in
+:mod:`src.utils.instrumentation` and prints its report to stderr when the
+command finishes; ``--profile-dir`` also captures cProfile and tracemalloc
+data and writes them, with the metrics as JSON, on exit and on ``SIGUSR1``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+
+from src.services.backfill import DEFAULT_CHUNK_SIZE, BackfillProgress, backfill
+from src.services.index import SessionIndex, SessionSummary
+from src.utils.instrumentation import ProfileDumper, format_report, metrics
+
+MB = 1024 * 1024
+
+
+def default_projects_dir() -> Path:
+    return Path.home() / ".claude" / "projects"
+
+
+def default_index_path() -> Path:
+    cache = os.environ.get("XDG_CACHE_HOME")
+    return (Path(cache) if cache else Path.home() / ".cache") / "ccmonitor" / "sessions.db"
+
+
+def _positive_int(value: str) -> int:
+    """``argparse`` type for counts that must be at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="ccmonitor", description="Monitor Claude Code conversations.")
+    parser.add_argument(
+        "--projects",
+        type=Path,
+        action="append",
+        help="Directory of project transcripts (repeatable; default: ~/.claude/projects).",
+    )
+    parser.add_argument("--index", type=Path, default=None, help="Session index database path.")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print per-stage timings, queue depths, throughput and RSS to stderr on exit "
+        "(backfill workers are not included with --jobs > 1).",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        type=Path,
+        default=None,
+        help="Like --profile, and write metrics JSON, cProfile and tracemalloc dumps here on exit and on SIGUSR1.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("sessions", help="List indexed sessions, most recent first.")
+
+    show = commands.add_parser("show", help="Print records from a transcript.")
+    show.add_argument("path", type=Path, help="Transcript JSONL file.")
+    show.add_argument("--at", type=int, default=0, help="Index of the first record (negative counts from the end).")
+    show.add_argument("--count", type=int, default=20, help="Number of records to print.")
+
+    fill = commands.add_parser("backfill", help="Index all transcripts in parallel.")
+    fill.add_argument(
+        "--jobs", "-j", type=_positive_int, default=None, help="Worker processes (default: number of CPUs)."
+    )
+    fill.add_argument("--force", action="store_true", help="Re-index files that are already up to date.")
+    fill.add_argument(
+        "--chunk-size",
+        type=_positive_int,
+        default=DEFAULT_CHUNK_SIZE // MB,
+        help="Split transcripts into ranges of about this many MB (default: %(default)s).",
+    )
+    fill.add_argument("--no-progress", action="store_true", help="Do not print a progress line.")
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.profile_dir is not None:
+        args.profile = True
+    if not args.profile:
+        return _run(args)
+    metrics.enable()
+    dumper = None if args.profile_dir is None else ProfileDumper(args.profile_dir)
+    try:
+        if dumper is not None:
+            dumper.start()
+            if hasattr(signal, "SIGUSR1"):
+                dumper.install_signal()
+        return _run(args)
+    finally:
+        if dumper is not None:
+            dumper.dump()
+            dumper.stop()
+        for line in format_report(metrics.snapshot()):
+            print(line, file=sys.stderr)
+        metrics.disable()
+
+
+def _run(args: argparse.Namespace) -> int:
+    with SessionIndex(args.index or default_index_path()) as index:
+        if args.command == "sessions":
+            return _list_sessions(index, args.projects or [default_projects_dir()])
+        if args.command == "backfill":
+            return _backfill(index, args.projects or [default_projects_dir()], args)
+        return _show(index, args.path, args.at, args.count)
+
+
+def _list_sessions(index: SessionIndex, roots: list[Path]) -> int:
+    for summary in index.refresh_all(root for root in roots if root.is_dir()):
+        print(_format_summary(summary))
+    return 0
+
+
+def _format_summary(s: SessionSummary) -> str:
+    span = f"{s.first_timestamp or '-'} .. {s.last_timestamp or '-'}"
+    return (
+        f"{s.session_id or s.path.stem}  {s.record_count:>8} records  {s.total_tokens:>12,} tokens  "
+        f"${s.cost_usd:>10.4f}  {span}  {s.path}"
+    )
+
+
+def _show(index: SessionIndex, path: Path, at: int, count: int) -> int:
+    summary = index.refresh(path)
+    if summary is None:
+        print(f"ccmonitor: {path}: no such file", file=sys.stderr)
+        return 1
+    start = max(0, summary.record_count + at) if at < 0 else at
+    for record in index.read_records(path, start, count):
+        print(json.dumps(record, separators=(",", ":")))
+    return 0
+
+
+def _backfill(index: SessionIndex, roots: list[Path], args: argparse.Namespace) -> int:
+    show_progress = not args.no_progress and sys.stderr.isatty()
+    done = backfill(
+        index,
+        [root for root in roots if root.is_dir()],
+        jobs=args.jobs,
+        chunk_size=args.chunk_size * MB,
+        force=args.force,
+        progress=_print_progress if show_progress else None,
+    )
+    if show_progress:
+        print(file=sys.stderr)
+    records = sum(s.record_count for s in done)
+    print(f"indexed {len(done)} files, {records:,} records")
+    return 0
+
+
+def _print_progress(p: BackfillProgress) -> None:
+    percent = 100 * p.bytes / p.total_bytes if p.total_bytes else 100.0
+    print(
+        f"\rbackfill: {p.files}/{p.total_files} files  {p.bytes / MB:,.1f}/{p.total_bytes / MB:,.1f} MB "
+        f"({percent:5.1f}%)  {p.records_per_second:,.0f} records/s",
+        end="",
+        file=sys.stderr,
+        flush=True,
+    )
@@ -0,0 +1,16 @@
+"""Core data model: decoded log records and metric aggregation."""
+
+from src.core.aggregation import BucketSeries, RollingAggregator, Totals, parse_timestamp
+from src.core.records import DEFAULT_TYPES, LogRecord, RecordDecoder, available_backends, parse_object
+
+__all__ = [
+    "DEFAULT_TYPES",
+    "BucketSeries",
+    "LogRecord",
+    "RecordDecoder",
+    "RollingAggregator",
+    "Totals",
+    "available_backends",
+    "parse_object",
+    "parse_timestamp",
+]
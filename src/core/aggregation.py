@@ -0,0 +1,331 @@
+"""Streaming, time-bucketed usage and cost aggregation.
+
+:class:`RollingAggregator` keeps, for the whole stream and for every
+session, model and project, a :class:`BucketSeries`: one ring of buckets per
+resolution (by default 1 s for the last hour, 1 min for the last day and 1 h
+for the last 31 days). Adding a record touches one bucket per ring, so it is
+O(1) regardless of history. A window query sums whole buckets, using the
+finest ring that still covers each part of the window, so it costs
+O(buckets) and never looks at individual records. Rings are sparse: they
+only hold buckets that received records, little more than ``size`` of them, so
+memory scales with the buckets actually used rather than with how many
+records were seen, and a short-lived session costs a few buckets instead of
+a full set of rings.
+
+Windows use whole-second semantics: a record at time ``t`` falls in second
+``floor(t)`` and belongs to ``[start, end)`` when that second does. A window
+reaching back past the finest ring has its start rounded down to the width
+of the finest ring that covers it, and one that ends before the finest ring
+has its end rounded down likewise; windows ending "now" are exact at the
+end. :meth:`RollingAggregator.effective_window` returns the seconds that
+were actually summed.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+import time
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, fields
+from datetime import UTC, datetime
+
+from src.core.records import NANOS_PER_USD, LogRecord
+from src.utils.instrumentation import metrics
+
+# (bucket width in seconds, number of buckets)
+DEFAULT_RESOLUTIONS: tuple[tuple[int, int], ...] = ((1, 3600), (60, 1440), (3600, 24 * 31))
+PRUNE_EVERY = 4096
+# Rings group their buckets into about this many blocks, each dropped whole once expired.
+RING_BLOCKS = 8
+
+
+@dataclass(slots=True)
+class Totals:
+    """Usage summed over some set of records."""
+
+    records: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_tokens: int = 0
+    cache_read_tokens: int = 0
+    cost_nanos: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens + self.cache_creation_tokens + self.cache_read_tokens
+
+    @property
+    def cost_usd(self) -> float:
+        return self.cost_nanos / NANOS_PER_USD
+
+    def add(self, record: LogRecord) -> None:
+        self.records += 1
+        self.input_tokens += record.input_tokens
+        self.output_tokens += record.output_tokens
+        self.cache_creation_tokens += record.cache_creation_tokens
+        self.cache_read_tokens += record.cache_read_tokens
+        self.cost_nanos += record.cost_nanos or 0
+
+    def merge(self, other: Totals) -> None:
+        self.records += other.records
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.cache_creation_tokens += other.cache_creation_tokens
+        self.cache_read_tokens += other.cache_read_tokens
+        self.cost_nanos += other.cost_nanos
+
+    def per_minute(self, seconds: float) -> Totals:
+        """Rates over a window of ``seconds``, as totals per minute (rounded down)."""
+        scale = 60 / seconds if seconds > 0 else 0.0
+        return Totals(*(int(getattr(self, f.name) * scale) for f in fields(self)))
+
+
+class _Ring:
+    """The newest ``size`` ``width``-second buckets, keyed by ``second // width``.
+
+    Only buckets that received records exist. They are grouped into blocks
+    of ``span`` consecutive ids, and blocks the head has moved past are
+    dropped whole whenever it enters a new block, so the ring holds fewer
+    than ``size + 2 * span`` buckets and never copies them.
+    """
+
+    __slots__ = ("blocks", "head", "size", "span", "width")
+
+    def __init__(self, width: int, size: int) -> None:
+        self.width = width
+        self.size = size
+        self.span = max(1, size // RING_BLOCKS)
+        self.head = -1  # newest bucket id seen
+        self.blocks: dict[int, dict[int, Totals]] = {}
+
+    def __len__(self) -> int:
+        """Buckets currently held, including expired ones not yet dropped."""
+        return sum(len(block) for block in self.blocks.values())
+
+    @property
+    def first_id(self) -> int:
+        """Oldest bucket id still held."""
+        return self.head - self.size + 1
+
+    def add(self, second: int, record: LogRecord) -> None:
+        bid = second // self.width
+        if bid > self.head:
+            crossed = bid // self.span != self.head // self.span
+            self.head = bid
+            if crossed:
+                self._expire()
+        elif bid <= self.head - self.size:
+            return
+        block = self.blocks.get(bid // self.span)
+        if block is None:
+            block = self.blocks[bid // self.span] = {}
+        totals = block.get(bid)
+        if totals is None:
+            totals = block[bid] = Totals()
+        totals.add(record)
+
+    def _expire(self) -> None:
+        oldest = self.first_id // self.span
+        for key in [key for key in self.blocks if key < oldest]:
+            del self.blocks[key]
+
+    def sum(self, start: int, end: int, into: Totals) -> None:
+        """Add buckets covering seconds ``[start, end)``; both multiples of ``width``."""
+        first = max(start // self.width, self.first_id)
+        last = min(-(-end // self.width), self.head + 1)
+        span = self.span
+        for key in range(first // span, (last - 1) // span + 1):
+            block = self.blocks.get(key)
+            if block is None:
+                continue
+            if first <= key * span and (key + 1) * span <= last:
+                for totals in block.values():
+                    into.merge(totals)
+            else:
+                for bid, totals in block.items():
+                    if first <= bid < last:
+                        into.merge(totals)
+
+
+class BucketSeries:
+    """Multi-resolution rings of buckets for one stream of records."""
+
+    __slots__ = ("rings",)
+
+    def __init__(self, resolutions: Sequence[tuple[int, int]] = DEFAULT_RESOLUTIONS) -> None:
+        self.rings = [_Ring(width, size) for width, size in resolutions]
+
+    @property
+    def newest(self) -> int:
+        """Start of the newest second seen, or -1."""
+        ring = self.rings[0]
+        return ring.head * ring.width if ring.head >= 0 else -1
+
+    def add(self, second: int, record: LogRecord) -> None:
+        for ring in self.rings:
+            ring.add(second, record)
+
+    def _coverage(self, ring: _Ring) -> int:
+        return max(0, ring.first_id * ring.width)
+
+    def plan(self, start: int, end: int) -> tuple[int, int, list[tuple[_Ring, int, int]]]:
+        """Split ``[start, end)`` into exact per-ring segments.
+
+        Returns the effective start and end and ``(ring, lower, upper)``
+        segments, newest first. The start is rounded down to the width of the
+        finest ring that still covers it (or clamped to the oldest data), and
+        the end is rounded down only if it lies before the finest ring.
+        """
+        for ring in self.rings:
+            if self._coverage(ring) <= start:
+                start = start // ring.width * ring.width
+                break
+        else:
+            start = max(start, self._coverage(self.rings[-1]))
+        segments: list[tuple[_Ring, int, int]] = []
+        upper = end
+        for finer, coarser in zip(self.rings, [*self.rings[1:], None], strict=True):
+            if upper <= start:
+                break
+            if coarser is None or self._coverage(finer) <= start:
+                segments.append((finer, start, upper))
+                break
+            # Hand over to the coarser ring at one of its bucket boundaries.
+            lower = max(start, -(-self._coverage(finer) // coarser.width) * coarser.width)
+            if lower < upper:
+                segments.append((finer, lower, upper))
+                upper = lower
+            else:
+                # Nothing exact to take from this ring: the window ends before
+                # it, so round the end down to the coarser ring's buckets.
+                upper = upper // coarser.width * coarser.width
+        end = segments[0][2] if segments else max(start, min(end, upper))
+        return start, end, segments
+
+    def window(self, start: int, end: int) -> Totals:
+        totals = Totals()
+        for ring, lower, upper in self.plan(start, end)[2]:
+            ring.sum(lower, upper, totals)
+        return totals
+
+
+def parse_timestamp(value: str | None) -> float | None:
+    """ISO-8601 timestamp (``Z`` or offset suffix) to epoch seconds."""
+    if value is None:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC)
+    return dt.timestamp()
+
+
+class RollingAggregator:
+    """Incremental usage totals over arbitrary recent time windows.
+
+    Records are aggregated overall and per session, model and project; a
+    query may filter on at most one of those.
+
+    Args:
+        resolutions: ``(bucket seconds, bucket count)`` per ring, finest
+            first. Each width must divide the next one.
+    """
+
+    def __init__(self, resolutions: Sequence[tuple[int, int]] = DEFAULT_RESOLUTIONS) -> None:
+        widths = [width for width, _ in resolutions]
+        spans = [width * size for width, size in resolutions]
+        if not widths or widths[0] < 1 or any(b % a for a, b in itertools.pairwise(widths)):
+            raise ValueError(f"bucket widths must be positive and each divide the next: {widths}")
+        # Each ring must reach far enough past the finer one to hand over at a
+        # bucket boundary of the next coarser ring.
+        for i in range(1, len(resolutions) - 1):
+            if spans[i] < spans[i - 1] + widths[i] + widths[i + 1]:
+                raise ValueError(f"ring {resolutions[i]} does not extend far enough past {resolutions[i - 1]}")
+        self.resolutions = tuple(resolutions)
+        self.undated = 0
+        self._series: dict[tuple[str, str | None], BucketSeries] = {}
+        self._adds = 0
+
+    @property
+    def retention(self) -> int:
+        """Seconds of history kept by the coarsest ring."""
+        width, size = self.resolutions[-1]
+        return width * size
+
+    def add(self, record: LogRecord, *, project: str | None = None, when: float | None = None) -> None:
+        """Fold ``record`` into every matching series.
+
+        ``when`` overrides the record's own timestamp; records with neither
+        are counted in :attr:`undated` and otherwise ignored.
+        """
+        if when is None:
+            when = parse_timestamp(record.timestamp)
+        if when is None:
+            self.undated += 1
+            return
+        second = math.floor(when)
+        keys: list[tuple[str, str | None]] = [("all", None)]
+        if record.session_id is not None:
+            keys.append(("session", record.session_id))
+        if record.model is not None:
+            keys.append(("model", record.model))
+        if project is not None:
+            keys.append(("project", project))
+        for key in keys:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = BucketSeries(self.resolutions)
+            series.add(second, record)
+        self._adds += 1
+        if self._adds % PRUNE_EVERY == 0:
+            self.prune()
+
+    def add_many(self, records: Iterable[LogRecord], *, project: str | None = None) -> None:
+        """:meth:`add` each of ``records``, timed as one batch of the ``aggregate`` stage."""
+        started = time.perf_counter()
+        count = 0
+        for record in records:
+            self.add(record, project=project)
+            count += 1
+        metrics.record("aggregate", time.perf_counter() - started, count)
+
+    def keys(self, dimension: str) -> list[str]:
+        """Sessions, models or projects that currently have data."""
+        return sorted(k for d, k in self._series if d == dimension and k is not None)
+
+    def effective_window(self, start: float, end: float, **key: str) -> tuple[int, int]:
+        """The ``[start, end)`` seconds that :meth:`window` actually sums."""
+        start, end = math.floor(start), math.ceil(end)
+        series = self._series.get(_key(key))
+        return (start, end) if series is None else series.plan(start, end)[:2]
+
+    def window(self, start: float, end: float, **key: str) -> Totals:
+        """Totals for seconds ``[start, end)``, optionally for one ``session``, ``model`` or ``project``."""
+        series = self._series.get(_key(key))
+        if series is None:
+            return Totals()
+        return series.window(math.floor(start), math.ceil(end))
+
+    def last(self, seconds: float, *, now: float | None = None, **key: str) -> Totals:
+        """Totals for the ``seconds`` up to and including the current second."""
+        end = math.floor(time.time() if now is None else now) + 1
+        return self.window(end - seconds, end, **key)
+
+    def prune(self) -> None:
+        """Drop per-key series with no data inside the retention period."""
+        newest = self._series[("all", None)].newest if ("all", None) in self._series else -1
+        cutoff = newest - self.retention
+        for key in [k for k, s in self._series.items() if k[0] != "all" and s.newest < cutoff]:
+            del self._series[key]
+
+
+def _key(key: dict[str, str]) -> tuple[str, str | None]:
+    if not key:
+        return ("all", None)
+    if len(key) > 1 or next(iter(key)) not in ("session", "model", "project"):
+        raise TypeError(f"filter on exactly one of session, model or project, not {sorted(key)}")
+    ((dimension, value),) = key.items()
+    return (dimension, value)
@@ -0,0 +1,360 @@
+"""Compact log records and a fast-path decoder for JSONL lines.
+
+Dashboards only look at a handful of fields per line: the record type,
+timestamp, session id, model and token usage (plus the reported cost). A
+:class:`LogRecord` holds just those in ``__slots__`` together with the raw
+line; the full JSON tree - message content, tool inputs and results - is
+only decoded when something asks for :attr:`LogRecord.data`.
+
+:class:`RecordDecoder` picks the fastest available backend:
+
+* ``msgspec`` decodes straight into typed structs that declare only the hot
+  fields, skipping everything else without building Python objects for it.
+* ``orjson`` does a full, but much faster, parse.
+* ``json`` from the standard library is the fallback.
+
+All backends produce identical records: whenever the typed ``msgspec`` path
+rejects a line (for example a field of an unexpected type) the line is
+re-decoded generically, and lines ``orjson`` would read differently from
+the stdlib parser - it rejects NaN and turns integers beyond 64 bits into
+floats - are re-parsed with ``json``. A byte-level pre-filter can drop lines
+whose top-level ``type`` is not wanted before any of them is parsed.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any, Literal
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional dependency
+    msgspec = None  # type: ignore[assignment]
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore[assignment]
+
+Backend = Literal["auto", "msgspec", "orjson", "json"]
+
+_fast_loads: Callable[[bytes], Any] = json.loads if orjson is None else orjson.loads
+
+NANOS_PER_USD = 1_000_000_000
+DEFAULT_TYPES: frozenset[str] = frozenset({"assistant", "user"})
+
+# orjson keeps integers in [-2**63, 2**64) exact; any integer outside has at
+# least 19 digits. Mapping every digit to "0" finds such runs with one
+# translate and one substring search instead of a much slower regex.
+_ZERO_DIGITS = bytes.maketrans(b"123456789", b"000000000")
+_LONG_NUMBER = b"0" * 19
+_INT64_LIMIT = float(2**63)
+
+
+def available_backends() -> list[str]:
+    """Decoder backends usable in this environment, fastest first."""
+    return [name for name, mod in (("msgspec", msgspec), ("orjson", orjson)) if mod is not None] + ["json"]
+
+
+class LogRecord:
+    """Hot fields of one log line; the rest is decoded on demand."""
+
+    __slots__ = (
+        "_data",
+        "_loads",
+        "_raw",
+        "cache_creation_tokens",
+        "cache_read_tokens",
+        "cost_nanos",
+        "input_tokens",
+        "model",
+        "output_tokens",
+        "session_id",
+        "timestamp",
+        "type",
+    )
+
+    def __init__(
+        self,
+        raw: bytes,
+        *,
+        type: str | None = None,
+        timestamp: str | None = None,
+        session_id: str | None = None,
+        model: str | None = None,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        cache_creation_tokens: int = 0,
+        cache_read_tokens: int = 0,
+        cost_nanos: int | None = None,
+        data: dict[str, Any] | None = None,
+        loads: Callable[[bytes], Any] = json.loads,
+    ) -> None:
+        self.type = type
+        self.timestamp = timestamp
+        self.session_id = session_id
+        self.model = model
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.cache_creation_tokens = cache_creation_tokens
+        self.cache_read_tokens = cache_read_tokens
+        self.cost_nanos = cost_nanos
+        self._raw = raw
+        self._data = data
+        self._loads = loads
+
+    def __repr__(self) -> str:
+        return f"LogRecord(type={self.type!r}, timestamp={self.timestamp!r}, model={self.model!r})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, LogRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in _HOT_FIELDS) and self._raw == other._raw
+
+    __hash__ = None  # type: ignore[assignment]
+
+    @property
+    def raw(self) -> bytes:
+        return self._raw
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens + self.cache_creation_tokens + self.cache_read_tokens
+
+    @property
+    def cost_usd(self) -> float | None:
+        return None if self.cost_nanos is None else self.cost_nanos / NANOS_PER_USD
+
+    @property
+    def data(self) -> dict[str, Any]:
+        """The full decoded line, parsed on first access and then cached."""
+        if self._data is None:
+            self._data = _loads_strict(self._raw, self._loads)
+        return self._data
+
+    @property
+    def message(self) -> dict[str, Any] | None:
+        message = self.data.get("message")
+        return message if isinstance(message, dict) else None
+
+    @property
+    def content(self) -> list[Any]:
+        """Message content blocks; a plain string body becomes one text block."""
+        message = self.message
+        content = None if message is None else message.get("content")
+        if isinstance(content, str):
+            return [{"type": "text", "text": content}]
+        return content if isinstance(content, list) else []
+
+    @property
+    def tool_uses(self) -> list[dict[str, Any]]:
+        return [block for block in self.content if isinstance(block, dict) and block.get("type") == "tool_use"]
+
+    def release(self) -> None:
+        """Drop the decoded body so only the hot fields and raw line stay resident."""
+        self._data = None
+
+
+_HOT_FIELDS = tuple(name for name in LogRecord.__slots__ if not name.startswith("_"))
+
+
+def _str(value: Any) -> str | None:
+    return value if isinstance(value, str) else None
+
+
+def _int(value: Any) -> int:
+    return value if isinstance(value, int) and not isinstance(value, bool) else 0
+
+
+def _cost(value: Any) -> int | None:
+    if not isinstance(value, int | float) or not math.isfinite(value):
+        return None
+    return round(value * NANOS_PER_USD)
+
+
+def _loads(line: bytes, loads: Callable[[bytes], Any]) -> Any:
+    try:
+        return loads(line)
+    except ValueError:
+        # orjson rejects some documents json accepts, such as NaN; stay consistent.
+        if loads is json.loads:
+            raise
+        return json.loads(line)
+
+
+def _loads_strict(line: bytes, loads: Callable[[bytes], Any]) -> Any:
+    """Parse with ``loads``, returning exactly what the stdlib parser returns."""
+    if loads is not json.loads and _LONG_NUMBER in line.translate(_ZERO_DIGITS):
+        # Possibly an integer orjson would turn into a float.
+        return json.loads(line)
+    return _loads(line, loads)
+
+
+def _loads_hot(line: bytes, loads: Callable[[bytes], Any]) -> Any:
+    """Like :func:`_loads_strict`, but only the hot fields are guaranteed to match.
+
+    Checking the few numbers a record keeps is much cheaper than searching
+    the whole line, and the rest of the tree is dropped anyway.
+    """
+    obj = _loads(line, loads)
+    if loads is not json.loads and isinstance(obj, dict) and _widened(obj):
+        return json.loads(line)
+    return obj
+
+
+def _widened(obj: dict[str, Any]) -> bool:
+    """Whether a hot number may be an integer beyond 64 bits that orjson read as a float."""
+    cost = obj.get("costUSD")
+    if isinstance(cost, float) and abs(cost) >= _INT64_LIMIT:
+        return True
+    message = obj.get("message")
+    usage = message.get("usage") if isinstance(message, dict) else None
+    # Token counts are almost always ints; only look closer when one is not.
+    if not isinstance(usage, dict) or float not in map(type, usage.values()):
+        return False
+    return any(isinstance(value, float) and abs(value) >= _INT64_LIMIT for value in usage.values())
+
+
+def parse_object(line: bytes) -> dict[str, Any] | None:
+    """Fully decode a line with the fastest parser; ``None`` unless it is a JSON object."""
+    try:
+        obj = _loads_strict(line, _fast_loads)
+    except ValueError:
+        return None
+    return obj if isinstance(obj, dict) else None
+
+
+def _record_from_dict(raw: bytes, obj: dict[str, Any], loads: Callable[[bytes], Any], keep: bool) -> LogRecord:
+    message = obj.get("message")
+    if not isinstance(message, dict):
+        message = {}
+    usage = message.get("usage")
+    if not isinstance(usage, dict):
+        usage = {}
+    return LogRecord(
+        raw,
+        type=_str(obj.get("type")),
+        timestamp=_str(obj.get("timestamp")),
+        session_id=_str(obj.get("sessionId")),
+        model=_str(message.get("model")),
+        input_tokens=_int(usage.get("input_tokens")),
+        output_tokens=_int(usage.get("output_tokens")),
+        cache_creation_tokens=_int(usage.get("cache_creation_input_tokens")),
+        cache_read_tokens=_int(usage.get("cache_read_input_tokens")),
+        cost_nanos=_cost(obj.get("costUSD")),
+        data=obj if keep else None,
+        loads=loads,
+    )
+
+
+if msgspec is not None:
+
+    class _Usage(msgspec.Struct):
+        input_tokens: int | None = None
+        output_tokens: int | None = None
+        cache_creation_input_tokens: int | None = None
+        cache_read_input_tokens: int | None = None
+
+    class _Message(msgspec.Struct):
+        model: Any = None
+        usage: _Usage | None = None
+
+    class _HotRecord(msgspec.Struct):
+        type: Any = None
+        timestamp: Any = None
+        sessionId: Any = None
+        # Integers stay exact, as they do with json.
+        costUSD: int | float | None = None
+        message: _Message | None = None
+
+
+class RecordDecoder:
+    """Decode JSONL lines into :class:`LogRecord` objects.
+
+    Args:
+        types: Top-level ``type`` values to keep; other lines are skipped,
+            most of them by a byte search before any parsing. ``None`` keeps
+            every JSON object.
+        backend: Force a specific backend instead of the fastest available.
+        keep_data: Keep the fully decoded line on the record instead of
+            re-parsing it on demand. Ignored by the ``msgspec`` backend,
+            which never builds the full tree.
+    """
+
+    def __init__(
+        self, types: Iterable[str] | None = DEFAULT_TYPES, *, backend: Backend = "auto", keep_data: bool = False
+    ) -> None:
+        self.types = None if types is None else frozenset(types)
+        self.keep_data = keep_data
+        self.skipped = 0
+        self.malformed = 0
+        if backend == "auto":
+            backend = available_backends()[0]  # type: ignore[assignment]
+        if backend not in available_backends():
+            raise ValueError(f"decoder backend {backend!r} is not available")
+        self.backend = backend
+        self._loads = json.loads if backend == "json" else _fast_loads
+        self._hot_decoder = msgspec.json.Decoder(_HotRecord) if backend == "msgspec" and msgspec else None
+        self._prefilter = None
+        if self.types is not None:
+            alternatives = b"|".join(re.escape(json.dumps(t).encode()) for t in sorted(self.types))
+            self._prefilter = re.compile(rb'"type"\s*:\s*(?:' + alternatives + rb")")
+
+    def decode(self, line: bytes) -> LogRecord | None:
+        """Decode one line; ``None`` if it is filtered out, blank or malformed."""
+        if self._prefilter is not None and self._prefilter.search(line) is None:
+            if line.strip():
+                self.skipped += 1
+            return None
+        if self._hot_decoder is not None:
+            record = self._decode_hot(line)
+            if record is not None:
+                return self._accept(record)
+        try:
+            obj = (_loads_strict if self.keep_data else _loads_hot)(line, self._loads)
+        except ValueError:
+            if line.strip():
+                self.malformed += 1
+            return None
+        if not isinstance(obj, dict):
+            self.malformed += 1
+            return None
+        return self._accept(_record_from_dict(line, obj, self._loads, self.keep_data))
+
+    def decode_lines(self, lines: Iterable[bytes]) -> Iterator[LogRecord]:
+        for line in lines:
+            record = self.decode(line)
+            if record is not None:
+                yield record
+
+    def _accept(self, record: LogRecord) -> LogRecord | None:
+        # The pre-filter can match a nested "type" key; check the real one.
+        if self.types is not None and record.type not in self.types:
+            self.skipped += 1
+            return None
+        return record
+
+    def _decode_hot(self, line: bytes) -> LogRecord | None:
+        assert self._hot_decoder is not None and msgspec is not None
+        try:
+            hot = self._hot_decoder.decode(line)
+        except (msgspec.ValidationError, msgspec.DecodeError):
+            # Unexpected shape or invalid JSON: let the generic path decide.
+            return None
+        message = hot.message
+        usage = None if message is None else message.usage
+        return LogRecord(
+            line,
+            type=_str(hot.type),
+            timestamp=_str(hot.timestamp),
+            session_id=_str(hot.sessionId),
+            model=None if message is None else _str(message.model),
+            input_tokens=0 if usage is None else usage.input_tokens or 0,
+            output_tokens=0 if usage is None else usage.output_tokens or 0,
+            cache_creation_tokens=0 if usage is None else usage.cache_creation_input_tokens or 0,
+            cache_read_tokens=0 if usage is None else usage.cache_read_input_tokens or 0,
+            cost_nanos=_cost(hot.costUSD),
+            loads=self._loads,
+        )
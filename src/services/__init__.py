@@ -0,0 +1,37 @@
+"""Services that watch and ingest Claude Code conversation logs."""
+
+from src.services.backfill import BackfillProgress, Chunk, backfill, plan_chunks
+from src.services.index import IndexedTranscript, SessionIndex, SessionSummary
+from src.services.store import SessionStore, StoreStats
+from src.services.tail import FileCursor, JSONLTailer, TailBatch
+from src.services.watcher import (
+    ChangeKind,
+    EventQueue,
+    InotifyBackend,
+    PollingBackend,
+    WatcherBackend,
+    WatchEvent,
+    create_watcher,
+)
+
+__all__ = [
+    "BackfillProgress",
+    "ChangeKind",
+    "Chunk",
+    "EventQueue",
+    "FileCursor",
+    "IndexedTranscript",
+    "InotifyBackend",
+    "JSONLTailer",
+    "PollingBackend",
+    "SessionIndex",
+    "SessionStore",
+    "SessionSummary",
+    "StoreStats",
+    "TailBatch",
+    "WatchEvent",
+    "WatcherBackend",
+    "backfill",
+    "create_watcher",
+    "plan_chunks",
+]
@@ -0,0 +1,180 @@
+"""Parallel (re)indexing of historical transcripts.
+
+Every file is cut into newline-aligned byte ranges of about ``chunk_size``
+bytes, so a single huge transcript is spread over several workers just like
+many small ones. Each worker scans one range with :func:`scan_range` and
+returns its partial :class:`SessionSummary` plus the offset of every record
+in the range, since it cannot know how many records precede the range.
+Results are merged in plan order, and the merge keeps only the offsets that
+fall on the index's ``stride`` grid, so the database written - summaries and
+checkpoints alike - is the one :meth:`SessionIndex.refresh` builds
+sequentially, for any number of workers.
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import time
+from array import array
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from src.services.index import RangeScan, SessionIndex, SessionSummary, scan_range
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 32 * 1024 * 1024
+
+
+@dataclass(frozen=True, slots=True)
+class Chunk:
+    """Byte range ``[start, end)`` of a transcript; both ends are line starts."""
+
+    path: Path
+    start: int
+    end: int
+
+
+@dataclass(slots=True)
+class BackfillProgress:
+    """Running totals reported after each merged chunk."""
+
+    files: int = 0
+    total_files: int = 0
+    bytes: int = 0
+    total_bytes: int = 0
+    records: int = 0
+    started: float = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def records_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.records / elapsed if elapsed > 0 else 0.0
+
+
+def plan_chunks(path: Path, size: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> list[Chunk]:
+    """Split the first ``size`` bytes of ``path`` at newlines after every ``chunk_size`` bytes."""
+    bounds = [0]
+    with open(path, "rb") as fh:
+        target = chunk_size
+        while target < size:
+            fh.seek(target)
+            # Scan forward to the start of the next line.
+            while True:
+                block = fh.read(64 * 1024)
+                idx = block.find(b"\n")
+                if idx >= 0:
+                    target = fh.tell() - len(block) + idx + 1
+                    break
+                if not block:
+                    target = size
+                    break
+            if target >= size:
+                break
+            bounds.append(target)
+            target += chunk_size
+    bounds.append(size)
+    return [Chunk(path, a, b) for a, b in itertools.pairwise(bounds)]
+
+
+def _scan_chunk(chunk: Chunk) -> tuple[RangeScan, array[int]]:
+    """Scan ``chunk``, returning its offsets of all records instead of checkpoints."""
+    scan = scan_range(chunk.path, chunk.start, chunk.end, stride=1)
+    offsets = array("q", (offset for _, offset in scan.checkpoints))
+    scan.checkpoints = []
+    return scan, offsets
+
+
+def backfill(
+    index: SessionIndex,
+    roots: Iterable[Path],
+    *,
+    jobs: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    force: bool = False,
+    progress: Callable[[BackfillProgress], None] | None = None,
+) -> list[SessionSummary]:
+    """Index every ``*.jsonl`` below ``roots`` using ``jobs`` processes.
+
+    Files whose index entry matches their size and mtime are skipped unless
+    ``force`` is set, and entries of files that no longer exist are dropped,
+    as in :meth:`SessionIndex.refresh_all`. ``jobs`` defaults to the number
+    of CPUs; with one job everything runs in the calling process.
+
+    Returns:
+        Summaries of the files that were (re)indexed, in path order.
+
+    Raises:
+        ValueError: ``jobs`` is less than 1.
+    """
+    if jobs is not None and jobs < 1:
+        raise ValueError(f"jobs must be at least 1, got {jobs}")
+    jobs = jobs or os.cpu_count() or 1
+    seen: set[Path] = set()
+    stats: dict[Path, os.stat_result] = {}
+    chunks: list[Chunk] = []
+    for root in roots:
+        for path in sorted(root.rglob("*.jsonl")):
+            if path in seen:
+                continue
+            try:
+                st = path.stat()
+                cached = None if force else index.summary(path)
+                if cached is None or (cached.size, cached.mtime_ns) != (st.st_size, st.st_mtime_ns):
+                    chunks += plan_chunks(path, st.st_size, chunk_size)
+                    stats[path] = st
+            except FileNotFoundError:
+                logger.debug("%s was deleted before it could be indexed", path)
+                continue
+            seen.add(path)
+    index.prune(seen)
+    report = BackfillProgress(
+        total_files=len(stats), total_bytes=sum(c.end - c.start for c in chunks), started=time.monotonic()
+    )
+    logger.info("Backfilling %d files (%d chunks) with %d jobs", len(stats), len(chunks), jobs)
+
+    if jobs == 1 or len(chunks) <= 1:
+        results: Iterator[tuple[RangeScan, array[int]]] = map(_scan_chunk, chunks)
+        return _merge(index, stats, chunks, results, report, progress)
+    with ProcessPoolExecutor(max_workers=min(jobs, len(chunks))) as pool:
+        return _merge(index, stats, chunks, pool.map(_scan_chunk, chunks), report, progress)
+
+
+def _merge(
+    index: SessionIndex,
+    stats: dict[Path, os.stat_result],
+    chunks: list[Chunk],
+    results: Iterator[tuple[RangeScan, array[int]]],
+    report: BackfillProgress,
+    progress: Callable[[BackfillProgress], None] | None,
+) -> list[SessionSummary]:
+    done: list[SessionSummary] = []
+    current: RangeScan | None = None
+    stride = index.stride
+    for chunk, (part, offsets) in zip(chunks, results, strict=True):
+        if chunk.start == 0:
+            current = RangeScan(SessionSummary(chunk.path), 0)
+        assert current is not None
+        base = current.summary.record_count
+        # The first record of the range whose overall number is a multiple of stride.
+        first = -base % stride
+        current.checkpoints.extend((base + k, offsets[k]) for k in range(first, len(offsets), stride))
+        current.summary.merge(part.summary)
+        current.end = part.end
+        report.bytes += chunk.end - chunk.start
+        report.records += part.summary.record_count
+        if chunk.end == stats[chunk.path].st_size:
+            index.store(chunk.path, stats[chunk.path], current.summary, current)
+            done.append(current.summary)
+            report.files += 1
+        if progress is not None:
+            progress(report)
+    return done
@@ -0,0 +1,499 @@
+"""Persistent sidecar index of conversation JSONL files.
+
+The index is a small SQLite database with one row per transcript holding its
+summary (line and record counts, timestamp range, token and cost totals) and
+a checkpoint table with the byte offset of every ``stride``-th record. With
+it, listing sessions is a single query instead of a scan of every log, and
+reading record ``n`` of a huge transcript is a B-tree lookup of the nearest
+checkpoint followed by at most ``stride`` lines of parsing.
+
+Entries are validated against the file's size, mtime and identity (device,
+inode and a fingerprint of its first bytes, as in :mod:`src.services.tail`).
+A file that only grew is indexed incrementally from where the previous scan
+stopped; a file that was truncated or replaced is re-indexed from scratch and
+gets a new :attr:`SessionSummary.generation`, which tells holders of records
+read from the old contents that they are stale.
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Collection, Iterable, Iterator
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from types import TracebackType
+from typing import Any, BinaryIO, Self, TypeVar
+
+from src.core.records import NANOS_PER_USD, LogRecord, RecordDecoder, parse_object
+from src.services.tail import (
+    DEFAULT_READ_SIZE,
+    FINGERPRINT_BYTES,
+    FileCursor,
+    fingerprint_matches,
+    take_fingerprint,
+)
+from src.utils.instrumentation import metrics
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R")
+
+DEFAULT_STRIDE = 256
+# Random reads only need about one stride of lines, not a full scan chunk.
+SEEK_READ_SIZE = 64 * 1024
+SCAN_BATCH = 256
+SCHEMA_VERSION = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    session_id TEXT,
+    line_count INTEGER NOT NULL,
+    record_count INTEGER NOT NULL,
+    malformed INTEGER NOT NULL,
+    first_timestamp TEXT,
+    last_timestamp TEXT,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    cache_creation_tokens INTEGER NOT NULL,
+    cache_read_tokens INTEGER NOT NULL,
+    cost_nanos INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    generation INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    device INTEGER NOT NULL,
+    fingerprint INTEGER NOT NULL,
+    fingerprint_len INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    path TEXT NOT NULL,
+    record INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    PRIMARY KEY (path, record)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+@dataclass(slots=True)
+class SessionSummary:
+    """Indexed metadata of one transcript file."""
+
+    path: Path
+    session_id: str | None = None
+    line_count: int = 0
+    record_count: int = 0
+    malformed: int = 0
+    first_timestamp: str | None = None
+    last_timestamp: str | None = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_tokens: int = 0
+    cache_read_tokens: int = 0
+    cost_nanos: int = 0
+    size: int = 0
+    mtime_ns: int = 0
+    # Changes whenever the file is re-indexed from scratch; unchanged while it only grows.
+    generation: int = 0
+
+    @property
+    def cost_usd(self) -> float:
+        return self.cost_nanos / NANOS_PER_USD
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens + self.cache_creation_tokens + self.cache_read_tokens
+
+    def add(self, record: LogRecord) -> None:
+        """Fold one decoded record into the aggregates."""
+        if self.session_id is None:
+            self.session_id = record.session_id
+        ts = record.timestamp
+        if ts is not None:
+            if self.first_timestamp is None or ts < self.first_timestamp:
+                self.first_timestamp = ts
+            if self.last_timestamp is None or ts > self.last_timestamp:
+                self.last_timestamp = ts
+        # Costs are summed as integer nano-dollars so totals do not depend on
+        # the order in which partial sums are combined.
+        self.cost_nanos += record.cost_nanos or 0
+        self.input_tokens += record.input_tokens
+        self.output_tokens += record.output_tokens
+        self.cache_creation_tokens += record.cache_creation_tokens
+        self.cache_read_tokens += record.cache_read_tokens
+
+    def merge(self, later: SessionSummary) -> None:
+        """Fold in the aggregates of a range of the file that follows this one."""
+        if self.session_id is None:
+            self.session_id = later.session_id
+        for ts in (later.first_timestamp, later.last_timestamp):
+            if ts is not None:
+                if self.first_timestamp is None or ts < self.first_timestamp:
+                    self.first_timestamp = ts
+                if self.last_timestamp is None or ts > self.last_timestamp:
+                    self.last_timestamp = ts
+        self.line_count += later.line_count
+        self.record_count += later.record_count
+        self.malformed += later.malformed
+        self.input_tokens += later.input_tokens
+        self.output_tokens += later.output_tokens
+        self.cache_creation_tokens += later.cache_creation_tokens
+        self.cache_read_tokens += later.cache_read_tokens
+        self.cost_nanos += later.cost_nanos
+
+
+_SUMMARY_COLUMNS = tuple(f.name for f in fields(SessionSummary))
+_CURSOR_COLUMNS = ("offset", "inode", "device", "fingerprint", "fingerprint_len")
+
+
+class SessionIndex:
+    """SQLite-backed index of transcript summaries and record offsets.
+
+    Args:
+        db_path: Database file; ``None`` keeps the index in memory.
+        stride: Record a checkpoint every ``stride`` records. Changing it
+            for an existing database re-indexes files as they are refreshed.
+    """
+
+    def __init__(self, db_path: Path | None = None, *, stride: int = DEFAULT_STRIDE) -> None:
+        self.db_path = db_path
+        self.stride = stride
+        if db_path is not None:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(":memory:" if db_path is None else db_path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+
+    def _migrate(self) -> None:
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        stride = None
+        if version == SCHEMA_VERSION:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'stride'").fetchone()
+            stride = int(row[0]) if row else None
+        if version and (version != SCHEMA_VERSION or stride != self.stride):
+            logger.info("Rebuilding session index (schema %s, stride %s)", version, stride)
+            with self._db:
+                for table in ("files", "checkpoints", "meta"):
+                    self._db.execute(f"DROP TABLE IF EXISTS {table}")
+        with self._db:
+            self._db.executescript(_SCHEMA)
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('stride', ?)", (str(self.stride),))
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    # -- queries ----------------------------------------------------------
+
+    def summary(self, path: Path) -> SessionSummary | None:
+        """Return the stored summary of ``path`` without validating it."""
+        row = self._db.execute(
+            f"SELECT {', '.join(_SUMMARY_COLUMNS)} FROM files WHERE path = ?", (str(path),)
+        ).fetchone()
+        return None if row is None else _summary_from_row(row)
+
+    def sessions(self) -> list[SessionSummary]:
+        """All indexed transcripts, most recently active first."""
+        rows = self._db.execute(
+            f"SELECT {', '.join(_SUMMARY_COLUMNS)} FROM files ORDER BY last_timestamp DESC, path"
+        ).fetchall()
+        return [_summary_from_row(row) for row in rows]
+
+    def checkpoint(self, path: Path, record: int) -> tuple[int, int]:
+        """Nearest checkpoint at or before ``record`` as ``(record, offset)``."""
+        row = self._db.execute(
+            "SELECT record, offset FROM checkpoints WHERE path = ? AND record <= ? ORDER BY record DESC LIMIT 1",
+            (str(path), record),
+        ).fetchone()
+        return (0, 0) if row is None else (row[0], row[1])
+
+    def read_records(self, path: Path, start: int, count: int) -> list[dict[str, Any]]:
+        """Read ``count`` records starting at record number ``start``.
+
+        Only the lines between the nearest checkpoint and the requested range
+        are read, so the cost does not depend on the position in the file.
+        """
+        return self._read(path, start, count, parse_object)
+
+    def read_log_records(self, path: Path, start: int, count: int) -> list[LogRecord]:
+        """Like :meth:`read_records`, as :class:`LogRecord` objects that decode their bodies on demand."""
+        return self._read(path, start, count, RecordDecoder(types=None).decode)
+
+    def _read(self, path: Path, start: int, count: int, decode: Callable[[bytes], R | None]) -> list[R]:
+        if count <= 0 or start < 0:
+            return []
+        record, offset = self.checkpoint(path, start)
+        out: list[R] = []
+        with open(path, "rb") as fh:
+            for _line_offset, line in _iter_lines(fh, offset, SEEK_READ_SIZE):
+                if not line.strip() or (obj := decode(line)) is None:
+                    continue
+                if record >= start:
+                    out.append(obj)
+                    if len(out) == count:
+                        break
+                record += 1
+        return out
+
+    # -- maintenance ------------------------------------------------------
+
+    def refresh(self, path: Path) -> SessionSummary | None:
+        """Bring the entry for ``path`` up to date and return it.
+
+        Returns ``None`` (and drops the entry) if the file no longer exists.
+        """
+        key = str(path)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self.forget(path)
+            return None
+
+        row = self._db.execute(
+            f"SELECT {', '.join(_SUMMARY_COLUMNS + _CURSOR_COLUMNS)} FROM files WHERE path = ?", (key,)
+        ).fetchone()
+        if row is not None:
+            summary = _summary_from_row(row[: len(_SUMMARY_COLUMNS)])
+            offset, inode, device, fingerprint, fingerprint_len = row[len(_SUMMARY_COLUMNS) :]
+            cursor = FileCursor(offset, inode, device, summary.size, fingerprint, fingerprint_len)
+            if st.st_size == summary.size and st.st_mtime_ns == summary.mtime_ns:
+                return summary
+            if (
+                (st.st_ino, st.st_dev) == (cursor.inode, cursor.device)
+                and st.st_size >= cursor.size
+                and fingerprint_matches(path, cursor)
+            ):
+                return self._scan(path, st, summary, cursor, rebuild=False)
+            logger.debug("%s was truncated or replaced, re-indexing", path)
+        return self._scan(path, st, SessionSummary(path), FileCursor(inode=st.st_ino, device=st.st_dev), rebuild=True)
+
+    def refresh_all(self, roots: Iterable[Path]) -> list[SessionSummary]:
+        """Refresh every ``*.jsonl`` below ``roots`` and drop vanished files."""
+        seen: set[Path] = set()
+        for root in roots:
+            for path in sorted(root.rglob("*.jsonl")):
+                if self.refresh(path) is not None:
+                    seen.add(path)
+        self.prune(seen)
+        return self.sessions()
+
+    def prune(self, keep: Collection[Path]) -> None:
+        """Forget every entry whose path is not in ``keep``."""
+        names = {str(path) for path in keep}
+        stale = [p for (p,) in self._db.execute("SELECT path FROM files") if p not in names]
+        for p in stale:
+            self.forget(Path(p))
+
+    def forget(self, path: Path) -> None:
+        with self._db:
+            self._db.execute("DELETE FROM files WHERE path = ?", (str(path),))
+            self._db.execute("DELETE FROM checkpoints WHERE path = ?", (str(path),))
+
+    def store(self, path: Path, st: os.stat_result, summary: SessionSummary, scan: RangeScan) -> None:
+        """Replace the entry for ``path`` with a summary built from a full scan.
+
+        ``scan`` supplies the checkpoints and the end of the last complete
+        line; ``st`` is the stat taken before the file was scanned.
+        """
+        cursor = FileCursor(offset=scan.end, inode=st.st_ino, device=st.st_dev)
+        self._store(path, st, summary, cursor, scan.checkpoints, rebuild=True)
+
+    def _scan(
+        self, path: Path, st: os.stat_result, summary: SessionSummary, cursor: FileCursor, *, rebuild: bool
+    ) -> SessionSummary:
+        scan = scan_range(path, cursor.offset, stride=self.stride, first_record=summary.record_count)
+        summary.merge(scan.summary)
+        cursor.offset = scan.end
+        self._store(path, st, summary, cursor, scan.checkpoints, rebuild=rebuild)
+        return summary
+
+    def _store(
+        self,
+        path: Path,
+        st: os.stat_result,
+        summary: SessionSummary,
+        cursor: FileCursor,
+        checkpoints: list[tuple[int, int]],
+        *,
+        rebuild: bool,
+    ) -> None:
+        key = str(path)
+        summary.size, summary.mtime_ns = st.st_size, st.st_mtime_ns
+        cursor.size = st.st_size
+        if cursor.fingerprint_len < FINGERPRINT_BYTES and cursor.size > cursor.fingerprint_len:
+            take_fingerprint(path, cursor)
+        with self._db:
+            if rebuild:
+                # Numbered across the whole index, so a file that was forgotten and
+                # indexed again does not get its old generation back.
+                row = self._db.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+                summary.generation = 1 + (0 if row is None else int(row[0]))
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('generation', ?)", (str(summary.generation),))
+                self._db.execute("DELETE FROM checkpoints WHERE path = ?", (key,))
+            self._db.executemany(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?)", ((key, r, o) for r, o in checkpoints)
+            )
+            values = [getattr(summary, c) for c in _SUMMARY_COLUMNS] + [getattr(cursor, c) for c in _CURSOR_COLUMNS]
+            values[0] = key
+            self._db.execute(
+                f"INSERT OR REPLACE INTO files ({', '.join(_SUMMARY_COLUMNS + _CURSOR_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(values))})",
+                values,
+            )
+
+
+@dataclass(slots=True)
+class RangeScan:
+    """Partial index of the complete lines in one byte range of a transcript."""
+
+    summary: SessionSummary
+    end: int
+    checkpoints: list[tuple[int, int]] = field(default_factory=list)
+
+
+def scan_range(
+    path: Path,
+    start: int = 0,
+    end: int | None = None,
+    *,
+    stride: int = DEFAULT_STRIDE,
+    first_record: int = 0,
+) -> RangeScan:
+    """Aggregate the lines of ``path`` that start in ``[start, end)``.
+
+    ``start`` must be the start of a line. Records are numbered from
+    ``first_record`` and a ``(record, offset)`` checkpoint is taken for every
+    record number divisible by ``stride``. The returned ``end`` is the offset
+    just past the last complete line that was read.
+    """
+    started = time.perf_counter()
+    scan = RangeScan(SessionSummary(path), start)
+    summary = scan.summary
+    decoder = RecordDecoder(types=None)
+    with open(path, "rb") as fh:
+        lines: Iterator[tuple[int, bytes]] = _iter_lines(fh, start)
+        if end is not None:
+            lines = itertools.takewhile(lambda item: item[0] < end, lines)
+        # Work in batches so the parse and aggregate stages can be timed without per-line overhead.
+        while batch := list(itertools.islice(lines, SCAN_BATCH)):
+            with metrics.stage("parse", len(batch)):
+                decoded = [decoder.decode(line) for _, line in batch]
+            with metrics.stage("aggregate", len(batch)):
+                for (line_offset, line), record in zip(batch, decoded, strict=True):
+                    summary.line_count += 1
+                    scan.end = line_offset + len(line) + 1
+                    if record is None:
+                        if line.strip():
+                            summary.malformed += 1
+                        continue
+                    number = first_record + summary.record_count
+                    if number % stride == 0:
+                        scan.checkpoints.append((number, line_offset))
+                    summary.record_count += 1
+                    summary.add(record)
+    metrics.record("ingest", time.perf_counter() - started, summary.record_count)
+    return scan
+
+
+class IndexedTranscript:
+    """Random-access records of one indexed transcript.
+
+    Satisfies :class:`~src.tui.virtual_list.RowSource`, so a view can page
+    through a transcript of any length while only holding a few blocks of
+    ``index.stride`` records, each read starting at its checkpoint.
+
+    Args:
+        index: Index holding the transcript's checkpoints.
+        path: Transcript file; it is refreshed in the index on construction.
+        cache_blocks: Number of decoded blocks to keep.
+    """
+
+    def __init__(self, index: SessionIndex, path: Path, *, cache_blocks: int = 8) -> None:
+        self.index = index
+        self.path = path
+        self.cache_blocks = cache_blocks
+        self._blocks: OrderedDict[int, list[dict[str, Any]]] = OrderedDict()
+        self._count = 0
+        self._generation: int | None = None
+        self.refresh()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> dict[str, Any]:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        block, pos = divmod(index, self.index.stride)
+        records = self._blocks.get(block)
+        if records is None:
+            records = self.index.read_records(self.path, block * self.index.stride, self.index.stride)
+            self._blocks[block] = records
+            if len(self._blocks) > self.cache_blocks:
+                self._blocks.popitem(last=False)
+        else:
+            self._blocks.move_to_end(block)
+        return records[pos]
+
+    def refresh(self) -> int:
+        """Pick up records appended since the last refresh; returns the new count."""
+        summary = self.index.refresh(self.path)
+        if summary is None or summary.generation != self._generation:
+            # Deleted, truncated or replaced: nothing cached describes the current file.
+            self._blocks.clear()
+        else:
+            # Only the last cached block can have been partial.
+            first_stale = self._count // self.index.stride
+            for block in [b for b in self._blocks if b >= first_stale]:
+                del self._blocks[block]
+        self._count = 0 if summary is None else summary.record_count
+        self._generation = None if summary is None else summary.generation
+        return self._count
+
+
+def _iter_lines(fh: BinaryIO, offset: int, read_size: int = DEFAULT_READ_SIZE) -> Iterator[tuple[int, bytes]]:
+    """Yield ``(line_offset, line)`` for newline-terminated lines from ``offset``.
+
+    ``line`` excludes the newline. An unterminated trailing line is not
+    yielded; it is picked up by a later scan once it is complete.
+    """
+    fh.seek(offset)
+    pending = b""
+    pos = offset
+    while chunk := fh.read(read_size):
+        data = pending + chunk if pending else chunk
+        start = 0
+        while (nl := data.find(b"\n", start)) >= 0:
+            yield pos + start, data[start:nl]
+            start = nl + 1
+        pos += start
+        pending = data[start:]
+
+
+def _summary_from_row(row: tuple[Any, ...]) -> SessionSummary:
+    summary = SessionSummary(*row)
+    summary.path = Path(row[0])
+    return summary
@@ -0,0 +1,283 @@
+"""Memory-bounded store of materialized sessions.
+
+A long-running monitor sees every record of every session, but only a few
+sessions are being looked at or written to at any one time.
+:class:`SessionStore` keeps each session's :class:`SessionSummary` - a few
+hundred bytes - for as long as the transcript exists, and its full records
+only while the session is among the most recently used ones that fit into
+``budget`` bytes.
+
+A session pushed out of the budget goes cold. By default it keeps only its
+summary, and its records are re-read from the transcript through the
+index's checkpoints when they are next asked for. With ``cold="zlib"`` (or
+``"lz4"`` when the optional ``lz4`` package is installed) the raw lines are
+kept compressed in memory instead. Compressed copies count against the same
+budget, and when the hot sessions need the room they are dropped to
+disk-only, oldest first.
+
+Resident size is an estimate: the length of each record's raw line plus a
+fixed per-record overhead for the :class:`LogRecord` and its fields. Only
+the hot fields are kept decoded; bodies are decoded on demand and released
+again. Repeated strings such as session ids and model names are shared
+between records.
+"""
+
+from __future__ import annotations
+
+import logging
+import sys
+import zlib
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Literal
+
+from src.core.records import LogRecord, RecordDecoder
+from src.services.index import SessionIndex, SessionSummary
+from src.utils.instrumentation import metrics
+
+try:
+    import lz4.frame as lz4_frame  # type: ignore[import-not-found, import-untyped]
+except ImportError:  # pragma: no cover - optional dependency
+    lz4_frame = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+ColdStorage = Literal["disk", "zlib", "lz4"]
+
+# Leaves room under a 10 MB footprint for allocator slack and transient reads.
+DEFAULT_BUDGET = 6 * 1024 * 1024
+# Resident cost of a record besides its raw line: the record itself, the
+# bytes object header, its timestamp string and the list slot pointing at it.
+RECORD_OVERHEAD = sys.getsizeof(LogRecord(b"")) + sys.getsizeof(b"") + sys.getsizeof("2026-01-01T00:00:00.000Z") + 8
+
+
+def available_cold_storage() -> list[str]:
+    """Values of ``cold`` usable in this environment."""
+    return ["disk", "zlib"] + (["lz4"] if lz4_frame is not None else [])
+
+
+@dataclass(slots=True)
+class StoreStats:
+    """How often sessions moved between hot, compressed and disk-only."""
+
+    loads: int = 0
+    thaws: int = 0
+    evictions: int = 0
+    drops: int = 0
+
+
+@dataclass(slots=True)
+class _Session:
+    summary: SessionSummary
+    # Hot: decoded records. Compressed: blocks of newline-joined raw lines.
+    records: list[LogRecord] | None = None
+    frozen: list[bytes] | None = None
+    nbytes: int = 0
+
+
+class SessionStore:
+    """Session summaries plus an LRU of fully materialized sessions.
+
+    Lists returned by :meth:`records` belong to the store: they grow while
+    the session is hot and are released when it is evicted, so callers
+    should not keep them beyond the current view.
+
+    Args:
+        index: Index that provides summaries and the checkpoints used to
+            re-read evicted sessions.
+        budget: Estimated bytes of record data to keep resident. The session
+            being read is always materialized, even when it alone exceeds
+            the budget.
+        cold: What an evicted session keeps: ``"disk"`` (nothing but its
+            summary), ``"zlib"`` or ``"lz4"`` (its lines, compressed).
+    """
+
+    def __init__(self, index: SessionIndex, *, budget: int = DEFAULT_BUDGET, cold: ColdStorage = "disk") -> None:
+        if cold not in available_cold_storage():
+            raise ValueError(f"cold storage {cold!r} is not available")
+        self.index = index
+        self.budget = budget
+        self.cold = cold
+        self.stats = StoreStats()
+        self._compress: Callable[[bytes], bytes] = zlib.compress
+        self._decompress: Callable[[bytes], bytes] = zlib.decompress
+        if cold == "lz4" and lz4_frame is not None:
+            self._compress, self._decompress = lz4_frame.compress, lz4_frame.decompress
+        self._sessions: dict[Path, _Session] = {}
+        # Sessions holding records or compressed lines, least recently used first.
+        self._resident: OrderedDict[Path, _Session] = OrderedDict()
+        self._bytes = 0
+        self._strings: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, path: object) -> bool:
+        return path in self._sessions
+
+    @property
+    def resident_bytes(self) -> int:
+        """Estimated size of all hot records and compressed lines."""
+        return self._bytes
+
+    @property
+    def hot(self) -> list[Path]:
+        """Materialized sessions, least recently used first."""
+        return [path for path, session in self._resident.items() if session.records is not None]
+
+    def summary(self, path: Path) -> SessionSummary | None:
+        """Aggregates of ``path`` as of the last :meth:`update`; never materializes it."""
+        session = self._sessions.get(path)
+        return self.update(path) if session is None else session.summary
+
+    def sessions(self) -> list[SessionSummary]:
+        """Summaries of every known session, most recently active first."""
+        summaries = sorted((s.summary for s in self._sessions.values()), key=lambda s: str(s.path))
+        return sorted(summaries, key=lambda s: s.last_timestamp or "", reverse=True)
+
+    def update(self, path: Path) -> SessionSummary | None:
+        """Pick up records appended to ``path`` since the last update.
+
+        Hot and compressed copies are extended with just the new records and
+        the session becomes the most recently used. A transcript the index
+        had to re-read from scratch (its summary's ``generation`` changed)
+        was replaced or rewritten, so any copy held of it is dropped, even if
+        the new file is larger than the old one.
+
+        Returns:
+            The new summary, or ``None`` if the file no longer exists.
+        """
+        fresh = self.index.refresh(path)
+        session = self._sessions.get(path)
+        if fresh is None:
+            if session is not None:
+                self.forget(path)
+            return None
+        if session is None:
+            self._sessions[path] = _Session(fresh)
+            return fresh
+        known = session.summary.record_count
+        stale = fresh.generation != session.summary.generation
+        session.summary = fresh
+        if stale:
+            self._unload(path, session)
+        elif fresh.record_count > known and path in self._resident:
+            added = self._prepare(self.index.read_log_records(path, known, fresh.record_count - known))
+            if session.records is not None:
+                session.records.extend(added)
+                self._account(session, _cost(added))
+            elif session.frozen is not None:
+                block = self._freeze(added)
+                session.frozen.append(block)
+                self._account(session, len(block))
+            self._resident.move_to_end(path)
+            self._enforce(keep=path)
+        return fresh
+
+    def records(self, path: Path) -> list[LogRecord]:
+        """Every record of ``path``, materializing it as the most recently used session.
+
+        Raises:
+            FileNotFoundError: ``path`` is not (or no longer) a transcript.
+        """
+        session = self._sessions.get(path)
+        if session is None:
+            if self.update(path) is None:
+                raise FileNotFoundError(path)
+            session = self._sessions[path]
+        if session.records is None:
+            if session.frozen is not None:
+                records = self._thaw(session.frozen)
+                self.stats.thaws += 1
+            else:
+                records = self._prepare(self.index.read_log_records(path, 0, session.summary.record_count))
+                self.stats.loads += 1
+                metrics.count("store.loads")
+            self._account(session, _cost(records) - session.nbytes)
+            session.records, session.frozen = records, None
+        self._resident[path] = session
+        self._resident.move_to_end(path)
+        self._enforce(keep=path)
+        return session.records
+
+    def evict(self, path: Path) -> None:
+        """Make ``path`` cold now, as if it had aged out of the budget."""
+        session = self._resident.get(path)
+        if session is not None and session.records is not None:
+            self._evict(path, session)
+
+    def forget(self, path: Path) -> None:
+        """Drop everything held for ``path``."""
+        session = self._sessions.pop(path, None)
+        if session is not None:
+            self._unload(path, session)
+
+    # -- internals --------------------------------------------------------
+
+    def _enforce(self, keep: Path) -> None:
+        """Evict least recently used sessions until the budget holds; ``keep`` stays."""
+        if self._bytes <= self.budget:
+            return
+        # Compress (or drop) hot sessions first, then drop compressed copies.
+        for path, session in list(self._resident.items()):
+            if self._bytes <= self.budget:
+                return
+            if path != keep and session.records is not None:
+                self._evict(path, session)
+        for path, session in list(self._resident.items()):
+            if self._bytes <= self.budget:
+                return
+            if path != keep and session.frozen is not None:
+                self._unload(path, session)
+                self.stats.drops += 1
+        if self._bytes > self.budget:
+            logger.debug("%s alone exceeds the store budget (%d > %d bytes)", keep, self._bytes, self.budget)
+
+    def _evict(self, path: Path, session: _Session) -> None:
+        assert session.records is not None
+        self.stats.evictions += 1
+        metrics.count("store.evictions")
+        if self.cold == "disk":
+            self._unload(path, session)
+            return
+        block = self._freeze(session.records)
+        session.records, session.frozen = None, [block]
+        self._account(session, len(block) - session.nbytes)
+
+    def _unload(self, path: Path, session: _Session) -> None:
+        self._account(session, -session.nbytes)
+        session.records = session.frozen = None
+        self._resident.pop(path, None)
+
+    def _account(self, session: _Session, delta: int) -> None:
+        session.nbytes += delta
+        self._bytes += delta
+        metrics.gauge("store.bytes", self._bytes)
+
+    def _prepare(self, records: list[LogRecord]) -> list[LogRecord]:
+        intern = self._strings.setdefault
+        for record in records:
+            record.release()
+            if record.type is not None:
+                record.type = intern(record.type, record.type)
+            if record.session_id is not None:
+                record.session_id = intern(record.session_id, record.session_id)
+            if record.model is not None:
+                record.model = intern(record.model, record.model)
+        return records
+
+    def _freeze(self, records: list[LogRecord]) -> bytes:
+        return self._compress(b"\n".join(record.raw for record in records))
+
+    def _thaw(self, blocks: list[bytes]) -> list[LogRecord]:
+        decoder = RecordDecoder(types=None)
+        records: list[LogRecord] = []
+        for block in blocks:
+            records.extend(decoder.decode_lines(self._decompress(block).split(b"\n")))
+        return self._prepare(records)
+
+
+def _cost(records: list[LogRecord]) -> int:
+    return sum(len(record.raw) for record in records) + len(records) * RECORD_OVERHEAD
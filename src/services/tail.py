@@ -0,0 +1,255 @@
+"""Incremental tail-follow ingestion for conversation JSONL files.
+
+Each followed file has a persistent :class:`FileCursor` that records how far
+it has been consumed (byte offset) and which physical file that offset refers
+to (device, inode, last observed size). Polling a file only reads the bytes
+appended since the previous poll, so the cost of picking up new entries is
+proportional to the amount of new data, not to the size of the transcript.
+
+Edge cases handled by :meth:`JSONLTailer.poll`:
+
+* **Partial trailing lines** - the writer may be midway through a line when we
+  read. Only newline-terminated lines are consumed; the cursor stays at the
+  start of the incomplete line until it is finished.
+* **Truncation** - if the file shrinks below the size seen last time, it was
+  truncated (or rewritten) and is re-read from the beginning.
+* **Rotation / replacement** - if the path now points at a different inode,
+  or the first bytes of the file no longer match the fingerprint taken when it
+  was first read (which catches inode reuse after delete-and-recreate), the
+  new file is read from the beginning.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+import time
+import zlib
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from src.utils.instrumentation import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_READ_SIZE = 1024 * 1024
+FINGERPRINT_BYTES = 256
+
+
+@dataclass(slots=True)
+class FileCursor:
+    """Read position of a single followed file."""
+
+    offset: int = 0
+    inode: int = 0
+    device: int = 0
+    size: int = 0
+    fingerprint: int = 0
+    fingerprint_len: int = 0
+
+    def to_dict(self) -> dict[str, int]:
+        """Serialize the cursor for the state file."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> FileCursor:
+        """Restore a cursor written by :meth:`to_dict`."""
+        return cls(
+            offset=int(data.get("offset", 0)),
+            inode=int(data.get("inode", 0)),
+            device=int(data.get("device", 0)),
+            size=int(data.get("size", 0)),
+            fingerprint=int(data.get("fingerprint", 0)),
+            fingerprint_len=int(data.get("fingerprint_len", 0)),
+        )
+
+
+@dataclass(slots=True)
+class TailBatch:
+    """Records appended to a file since the previous poll."""
+
+    path: Path
+    records: list[dict[str, Any]] = field(default_factory=list)
+    start_offset: int = 0
+    end_offset: int = 0
+    reset: bool = False
+    malformed: int = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.records) or self.reset
+
+
+class JSONLTailer:
+    """Follow any number of JSONL files, parsing only newly appended lines.
+
+    Args:
+        state_path: Optional JSON file used to persist cursors between runs.
+            Cursors are loaded on construction and written by :meth:`save`.
+        start_at_end: When a file is seen for the first time, skip its
+            existing content and only report lines appended afterwards.
+        read_size: Chunk size used when reading new data.
+    """
+
+    def __init__(
+        self,
+        state_path: Path | None = None,
+        *,
+        start_at_end: bool = False,
+        read_size: int = DEFAULT_READ_SIZE,
+    ) -> None:
+        self.state_path = state_path
+        self.start_at_end = start_at_end
+        self.read_size = read_size
+        self._cursors: dict[str, FileCursor] = {}
+        if state_path is not None:
+            self.load()
+
+    @property
+    def paths(self) -> list[Path]:
+        """Files that currently have a cursor."""
+        return [Path(p) for p in self._cursors]
+
+    def cursor(self, path: Path) -> FileCursor | None:
+        """Return the cursor for ``path`` if the file is being followed."""
+        return self._cursors.get(str(path))
+
+    def forget(self, path: Path) -> None:
+        """Drop the cursor for ``path``."""
+        self._cursors.pop(str(path), None)
+
+    def poll(self, path: Path) -> TailBatch | None:
+        """Read and parse complete lines appended to ``path``.
+
+        Returns:
+            The new records, or ``None`` if the file no longer exists (its
+            cursor is dropped in that case).
+        """
+        started = time.perf_counter()
+        key = str(path)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self.forget(path)
+            return None
+
+        cursor = self._cursors.get(key)
+        reset = False
+        if cursor is None:
+            start = st.st_size if self.start_at_end else 0
+            cursor = FileCursor(offset=start, inode=st.st_ino, device=st.st_dev, size=start)
+            self._cursors[key] = cursor
+            if self.start_at_end:
+                # Don't consume a partial line: rewind to the last newline.
+                cursor.offset = _last_line_start(path, st.st_size)
+        elif (st.st_ino, st.st_dev) != (cursor.inode, cursor.device) or (
+            st.st_size != cursor.size and not fingerprint_matches(path, cursor)
+        ):
+            logger.debug("%s was replaced, re-reading from start", path)
+            cursor.inode, cursor.device = st.st_ino, st.st_dev
+            cursor.offset = cursor.size = cursor.fingerprint_len = 0
+            reset = True
+        elif st.st_size < cursor.size:
+            logger.debug("%s was truncated, re-reading from start", path)
+            cursor.offset = cursor.size = cursor.fingerprint_len = 0
+            reset = True
+
+        batch = TailBatch(path=path, start_offset=cursor.offset, end_offset=cursor.offset, reset=reset)
+        if st.st_size > cursor.offset:
+            self._read_new(path, cursor, batch)
+        cursor.size = max(st.st_size, cursor.offset)
+        if cursor.fingerprint_len < FINGERPRINT_BYTES and cursor.size > cursor.fingerprint_len:
+            take_fingerprint(path, cursor)
+        metrics.record("ingest", time.perf_counter() - started, len(batch.records))
+        return batch
+
+    def _read_new(self, path: Path, cursor: FileCursor, batch: TailBatch) -> None:
+        pending = b""
+        with open(path, "rb") as fh:
+            fh.seek(cursor.offset)
+            while chunk := fh.read(self.read_size):
+                data = pending + chunk if pending else chunk
+                cut = data.rfind(b"\n")
+                if cut < 0:
+                    pending = data
+                    continue
+                pending = data[cut + 1 :]
+                self._parse_lines(data[: cut + 1], batch)
+                cursor.offset += cut + 1
+        batch.end_offset = cursor.offset
+
+    @staticmethod
+    def _parse_lines(data: bytes, batch: TailBatch) -> None:
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                batch.malformed += 1
+                continue
+            if isinstance(record, dict):
+                batch.records.append(record)
+            else:
+                batch.malformed += 1
+
+    def load(self) -> None:
+        """Load cursors from :attr:`state_path`, ignoring a missing or corrupt file."""
+        if self.state_path is None or not self.state_path.exists():
+            return
+        try:
+            data = json.loads(self.state_path.read_text(encoding="utf-8"))
+            self._cursors = {p: FileCursor.from_dict(c) for p, c in data.get("cursors", {}).items()}
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            logger.warning("Ignoring unreadable tail state %s: %s", self.state_path, e)
+            self._cursors = {}
+
+    def save(self) -> None:
+        """Atomically write all cursors to :attr:`state_path`."""
+        if self.state_path is None:
+            return
+        payload = {"version": 1, "cursors": {p: c.to_dict() for p, c in self._cursors.items()}}
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.state_path.parent, prefix=".tail-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(payload, fh)
+            os.replace(tmp, self.state_path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+
+def _read_head(path: Path, length: int) -> bytes:
+    with open(path, "rb") as fh:
+        return fh.read(length)
+
+
+def fingerprint_matches(path: Path, cursor: FileCursor) -> bool:
+    """Check that the file still starts with the bytes seen on first read."""
+    if cursor.fingerprint_len == 0:
+        return True
+    head = _read_head(path, cursor.fingerprint_len)
+    return len(head) == cursor.fingerprint_len and zlib.crc32(head) == cursor.fingerprint
+
+
+def take_fingerprint(path: Path, cursor: FileCursor) -> None:
+    """Remember a checksum of the first :data:`FINGERPRINT_BYTES` of the file in ``cursor``."""
+    head = _read_head(path, FINGERPRINT_BYTES)
+    cursor.fingerprint, cursor.fingerprint_len = zlib.crc32(head), len(head)
+
+
+def _last_line_start(path: Path, size: int, window: int = 64 * 1024) -> int:
+    """Return the offset just past the last newline at or before ``size``."""
+    with open(path, "rb") as fh:
+        end = size
+        while end > 0:
+            start = max(0, end - window)
+            fh.seek(start)
+            idx = fh.read(end - start).rfind(b"\n")
+            if idx >= 0:
+                return start + idx + 1
+            end = start
+    return 0
@@ -0,0 +1,548 @@
+"""Filesystem change notification for conversation log directories.
+
+Two interchangeable backends feed a single :class:`EventQueue`:
+
+* :class:`InotifyBackend` talks to the Linux inotify API through ``ctypes``
+  and blocks in ``select`` between events, so an idle monitor uses no CPU.
+* :class:`PollingBackend` is the portable fallback. Every file and directory
+  has its own poll interval: it drops to ``min_interval`` as soon as a change
+  is seen, stays there for ``hot_window`` seconds, and only then backs off
+  exponentially up to ``max_interval``, so transcripts written in bursts
+  with pauses between them are noticed quickly without stat-ing thousands of
+  cold files at the same rate.
+
+The queue coalesces repeated events for the same path and releases them once
+the path has been quiet for ``debounce`` seconds, or at the latest
+``max_latency`` seconds after the first event, so a file that is written
+continuously is still reported promptly.
+
+Use :func:`create_watcher` to get the best backend for the platform.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import heapq
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from types import TracebackType
+from typing import ClassVar, Literal, Self
+
+from src.utils.instrumentation import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUFFIXES: tuple[str, ...] = (".jsonl",)
+
+
+class ChangeKind(Enum):
+    """Kind of filesystem change reported by a watcher."""
+
+    CREATED = "created"
+    MODIFIED = "modified"
+    DELETED = "deleted"
+    # Events were lost (kernel queue overflow); consumers should rescan.
+    OVERFLOW = "overflow"
+
+
+@dataclass(frozen=True, slots=True)
+class WatchEvent:
+    """A coalesced change to a single path."""
+
+    path: Path
+    kind: ChangeKind
+
+
+@dataclass(slots=True)
+class _Pending:
+    kind: ChangeKind
+    first: float
+    last: float
+
+
+class EventQueue:
+    """Thread-safe queue that coalesces and debounces change events.
+
+    Args:
+        debounce: Quiet period after the last event for a path before it is
+            released.
+        max_latency: Upper bound on how long an event can be held back while
+            the path keeps changing.
+    """
+
+    def __init__(self, debounce: float = 0.01, max_latency: float = 0.04) -> None:
+        self.debounce = debounce
+        self.max_latency = max_latency
+        self._cond = threading.Condition()
+        self._pending: dict[Path, _Pending] = {}
+        self._closed = False
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def put(self, path: Path, kind: ChangeKind) -> None:
+        """Record a change, merging it with any pending event for ``path``."""
+        now = time.monotonic()
+        with self._cond:
+            pending = self._pending.get(path)
+            if pending is None:
+                self._pending[path] = _Pending(kind, now, now)
+            else:
+                # A file created and then written is still just "created".
+                if not (pending.kind is ChangeKind.CREATED and kind is ChangeKind.MODIFIED):
+                    pending.kind = kind
+                pending.last = now
+            metrics.gauge("queue.watch", len(self._pending))
+            self._cond.notify_all()
+
+    def get(self, timeout: float | None = None) -> list[WatchEvent]:
+        """Wait for events that are ready to be delivered.
+
+        Returns:
+            The ready events in first-seen order, or an empty list if the
+            timeout expired or the queue was closed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._closed:
+                now = time.monotonic()
+                ready: list[WatchEvent] = []
+                wake_at = deadline
+                for path, pending in self._pending.items():
+                    due = min(pending.last + self.debounce, pending.first + self.max_latency)
+                    if due <= now:
+                        ready.append(WatchEvent(path, pending.kind))
+                    elif wake_at is None or due < wake_at:
+                        wake_at = due
+                if ready:
+                    for event in ready:
+                        del self._pending[event.path]
+                    return ready
+                if deadline is not None and now >= deadline:
+                    break
+                self._cond.wait(None if wake_at is None else max(0.0, wake_at - now))
+        return []
+
+    def close(self) -> None:
+        """Wake up and release any consumer blocked in :meth:`get`."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class WatcherBackend(ABC):
+    """Base class for watcher backends.
+
+    A backend watches directory trees on a background thread and pushes
+    changes to files whose suffix is in ``suffixes`` (all files if ``None``)
+    onto ``queue``.
+    """
+
+    name: ClassVar[str]
+
+    def __init__(self, queue: EventQueue, *, suffixes: Iterable[str] | None = DEFAULT_SUFFIXES) -> None:
+        self.queue = queue
+        self.suffixes = None if suffixes is None else frozenset(suffixes)
+        self.roots: list[Path] = []
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @classmethod
+    def available(cls) -> bool:
+        """Whether this backend can be used on the current platform."""
+        return True
+
+    @abstractmethod
+    def watch(self, directory: Path) -> None:
+        """Start watching ``directory`` and everything below it."""
+
+    @abstractmethod
+    def _run(self) -> None:
+        """Backend event loop, run on the watcher thread."""
+
+    def start(self) -> None:
+        """Start the watcher thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"ccmonitor-{self.name}-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the watcher thread and wait for it to exit."""
+        self._stop.set()
+        self._wake()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _wake(self) -> None:
+        """Interrupt the event loop so it notices :meth:`stop`."""
+
+    def _matches(self, path: Path) -> bool:
+        return self.suffixes is None or path.suffix in self.suffixes
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.stop()
+
+
+# inotify(7) constants
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+    | _IN_MOVE_SELF
+    | _IN_ONLYDIR
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_libc() -> ctypes.CDLL | None:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    if not all(hasattr(libc, fn) for fn in ("inotify_init1", "inotify_add_watch", "inotify_rm_watch")):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+class InotifyBackend(WatcherBackend):
+    """Linux inotify backend using ``ctypes``; no third-party dependency."""
+
+    name = "inotify"
+
+    def __init__(self, queue: EventQueue, *, suffixes: Iterable[str] | None = DEFAULT_SUFFIXES) -> None:
+        super().__init__(queue, suffixes=suffixes)
+        libc = _load_libc()
+        if libc is None:
+            raise OSError("inotify is not available on this platform")
+        self._libc = libc
+        self._lock = threading.Lock()
+        self._wds: dict[int, Path] = {}
+        self._fd = self._wake_r = self._wake_w = -1
+        self._open()
+
+    @classmethod
+    def available(cls) -> bool:
+        return _load_libc() is not None
+
+    def _open(self) -> None:
+        fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+        self._fd = fd
+        self._wake_r, self._wake_w = os.pipe()
+
+    def _close(self) -> None:
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            if fd >= 0:
+                os.close(fd)
+        self._fd = self._wake_r = self._wake_w = -1
+        with self._lock:
+            self._wds.clear()
+
+    def watch(self, directory: Path) -> None:
+        self.roots.append(directory)
+        # While stopped there is no descriptor; start() adds every root.
+        if self._fd >= 0:
+            self._add_tree(directory, report=False)
+
+    def start(self) -> None:
+        if self._fd < 0:
+            # Restarted after stop(): the old descriptor and its watches are gone.
+            self._open()
+            for root in self.roots:
+                self._add_tree(root, report=False)
+        super().start()
+
+    def stop(self) -> None:
+        """Stop the watcher thread and release the inotify descriptor."""
+        super().stop()
+        self._close()
+
+    def _add_tree(self, directory: Path, *, report: bool) -> None:
+        for root, _dirs, files in os.walk(directory):
+            root_path = Path(root)
+            self._add_dir(root_path)
+            if report:
+                # Files created before the watch was in place.
+                for name in files:
+                    path = root_path / name
+                    if self._matches(path):
+                        self.queue.put(path, ChangeKind.CREATED)
+
+    def _add_dir(self, directory: Path) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            logger.warning("Cannot watch %s: %s", directory, os.strerror(errno))
+            return
+        with self._lock:
+            self._wds[wd] = directory
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            readable, _, _ = select.select([self._fd, self._wake_r], [], [])
+            if self._fd in readable:
+                self._drain()
+
+    def _wake(self) -> None:
+        try:
+            os.write(self._wake_w, b"\0")
+        except OSError:
+            pass
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                self._dispatch(wd, mask, os.fsdecode(name))
+
+    def _dispatch(self, wd: int, mask: int, name: str) -> None:
+        if mask & _IN_Q_OVERFLOW:
+            logger.warning("inotify queue overflowed; requesting rescan")
+            for root in self.roots:
+                self.queue.put(root, ChangeKind.OVERFLOW)
+            return
+        with self._lock:
+            directory = self._wds.get(wd)
+            if mask & _IN_IGNORED:
+                self._wds.pop(wd, None)
+        if directory is None or not name:
+            return
+        path = directory / name
+        if mask & _IN_ISDIR:
+            if mask & (_IN_CREATE | _IN_MOVED_TO):
+                self._add_tree(path, report=True)
+            return
+        if not self._matches(path):
+            return
+        if mask & (_IN_CREATE | _IN_MOVED_TO):
+            self.queue.put(path, ChangeKind.CREATED)
+        elif mask & (_IN_DELETE | _IN_MOVED_FROM):
+            self.queue.put(path, ChangeKind.DELETED)
+        elif mask & (_IN_MODIFY | _IN_CLOSE_WRITE):
+            self.queue.put(path, ChangeKind.MODIFIED)
+
+
+@dataclass(slots=True)
+class _PollEntry:
+    is_dir: bool
+    signature: tuple[int, int, int]
+    interval: float
+    due: float = 0.0
+    # When the path last changed; it is polled at min_interval until hot_window after this.
+    changed: float = float("-inf")
+    children: set[str] = field(default_factory=set)
+
+
+class PollingBackend(WatcherBackend):
+    """Portable ``stat`` polling backend with per-path adaptive intervals.
+
+    Args:
+        min_interval: Poll interval for a path that has changed recently.
+        max_interval: Ceiling the interval backs off to while a path is idle.
+        backoff: Factor the interval grows by after each unchanged poll.
+        hot_window: Seconds after a change during which a path keeps being
+            polled at ``min_interval`` before backing off.
+    """
+
+    name = "polling"
+
+    def __init__(
+        self,
+        queue: EventQueue,
+        *,
+        suffixes: Iterable[str] | None = DEFAULT_SUFFIXES,
+        min_interval: float = 0.02,
+        max_interval: float = 5.0,
+        backoff: float = 2.0,
+        hot_window: float = 30.0,
+    ) -> None:
+        super().__init__(queue, suffixes=suffixes)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.hot_window = hot_window
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._entries: dict[Path, _PollEntry] = {}
+        self._heap: list[tuple[float, str]] = []
+
+    def watch(self, directory: Path) -> None:
+        with self._lock:
+            self.roots.append(directory)
+            self._add(directory, is_dir=True, report=False)
+        self._wakeup.set()
+
+    def _add(self, path: Path, *, is_dir: bool, report: bool) -> None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        now = time.monotonic()
+        entry = _PollEntry(is_dir=is_dir, signature=_signature(st), interval=self.min_interval)
+        if report:
+            # Newly created paths are likely to be written to next.
+            entry.changed = now
+        self._entries[path] = entry
+        if is_dir:
+            try:
+                children = list(os.scandir(path))
+            except OSError:
+                children = []
+            for child in children:
+                child_path = Path(child.path)
+                if child.is_dir(follow_symlinks=False):
+                    entry.children.add(child.name)
+                    self._add(child_path, is_dir=True, report=report)
+                elif self._matches(child_path):
+                    entry.children.add(child.name)
+                    self._add(child_path, is_dir=False, report=report)
+        elif report:
+            self.queue.put(path, ChangeKind.CREATED)
+        self._schedule(path, entry, now)
+
+    def _remove(self, path: Path) -> None:
+        entry = self._entries.pop(path, None)
+        if entry is None:
+            return
+        if entry.is_dir:
+            for name in entry.children:
+                self._remove(path / name)
+        else:
+            self.queue.put(path, ChangeKind.DELETED)
+
+    def _schedule(self, path: Path, entry: _PollEntry, now: float) -> None:
+        entry.due = now + entry.interval
+        heapq.heappush(self._heap, (entry.due, str(path)))
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            with self._lock:
+                now = time.monotonic()
+                while self._heap and self._heap[0][0] <= now:
+                    due, key = heapq.heappop(self._heap)
+                    path = Path(key)
+                    entry = self._entries.get(path)
+                    if entry is None or entry.due != due:
+                        continue  # stale heap item
+                    self._check(path, entry, now)
+                    if path in self._entries:
+                        self._schedule(path, entry, now)
+                timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+            self._wakeup.wait(None if timeout is None else max(0.0, timeout))
+            self._wakeup.clear()
+
+    def _wake(self) -> None:
+        self._wakeup.set()
+
+    def _check(self, path: Path, entry: _PollEntry, now: float) -> None:
+        try:
+            signature = _signature(os.stat(path))
+        except OSError:
+            self._remove(path)
+            parent = self._entries.get(path.parent)
+            if parent is not None:
+                parent.children.discard(path.name)
+            return
+        if signature == entry.signature:
+            if now - entry.changed >= self.hot_window:
+                entry.interval = min(entry.interval * self.backoff, self.max_interval)
+            return
+        entry.signature = signature
+        entry.interval = self.min_interval
+        entry.changed = now
+        if entry.is_dir:
+            self._rescan_dir(path, entry)
+        else:
+            self.queue.put(path, ChangeKind.MODIFIED)
+
+    def _rescan_dir(self, path: Path, entry: _PollEntry) -> None:
+        try:
+            children = {c.name: c.is_dir(follow_symlinks=False) for c in os.scandir(path)}
+        except OSError:
+            return
+        for name in entry.children - children.keys():
+            self._remove(path / name)
+        for name, is_dir in children.items():
+            if name in entry.children:
+                continue
+            child_path = path / name
+            if is_dir or self._matches(child_path):
+                entry.children.add(name)
+                self._add(child_path, is_dir=is_dir, report=True)
+        entry.children &= children.keys()
+
+
+def _signature(st: os.stat_result) -> tuple[int, int, int]:
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def create_watcher(
+    queue: EventQueue,
+    *,
+    backend: Literal["auto", "inotify", "polling"] = "auto",
+    suffixes: Iterable[str] | None = DEFAULT_SUFFIXES,
+) -> WatcherBackend:
+    """Create a watcher, preferring inotify and falling back to polling."""
+    if backend in ("auto", "inotify") and InotifyBackend.available():
+        try:
+            return InotifyBackend(queue, suffixes=suffixes)
+        except OSError as e:
+            if backend == "inotify":
+                raise
+            logger.info("inotify unavailable (%s); falling back to polling", e)
+    elif backend == "inotify":
+        raise OSError("inotify is not available on this platform")
+    return PollingBackend(queue, suffixes=suffixes)
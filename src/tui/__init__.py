@@ -0,0 +1,20 @@
+"""Terminal UI for browsing Claude Code conversations."""
+
+from src.tui.ingest import IngestPump, IngestStats
+from src.tui.profile_panel import ProfilePanel
+from src.tui.refresh import FrameStats, ListWidget, RefreshScheduler, Widget
+from src.tui.virtual_list import HeightCache, RowSource, VirtualList, wrap_text
+
+__all__ = [
+    "FrameStats",
+    "HeightCache",
+    "IngestPump",
+    "IngestStats",
+    "ListWidget",
+    "ProfilePanel",
+    "RefreshScheduler",
+    "RowSource",
+    "VirtualList",
+    "Widget",
+    "wrap_text",
+]
@@ -0,0 +1,115 @@
+"""Backpressured hand-off of ingested records to the UI event loop.
+
+Reading and decoding transcripts is CPU work that must not run on the event
+loop that also handles keypresses and draws frames. :class:`IngestPump`
+keeps it on a worker thread and passes finished batches to the loop through
+a bounded queue. When the loop falls behind, the queue fills up and the
+worker blocks in :meth:`IngestPump.submit`, so a burst of lines slows the
+producer down instead of piling up in memory.
+
+On the loop, batches are applied in slices of at most ``slice_size`` items,
+yielding to other tasks after each slice. A keypress therefore never waits
+for more than one slice, however large the burst.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+from src.utils.instrumentation import metrics
+
+T = TypeVar("T")
+
+DEFAULT_MAX_PENDING = 8
+DEFAULT_SLICE_SIZE = 256
+
+_CLOSE = object()
+
+
+@dataclass(slots=True)
+class IngestStats:
+    """Counters for the producer and consumer sides of an :class:`IngestPump`."""
+
+    batches: int = 0
+    items: int = 0
+    slices: int = 0
+    max_depth: int = 0
+
+
+class IngestPump(Generic[T]):
+    """Bounded queue of record batches consumed on the event loop.
+
+    Args:
+        apply: Called on the event loop with each slice of items, typically
+            to append them to a session's rows and mark its widget dirty.
+        max_pending: Batches that may wait for the loop before producers
+            block.
+        slice_size: Most items passed to ``apply`` before yielding to other
+            tasks.
+    """
+
+    def __init__(
+        self,
+        apply: Callable[[Sequence[T]], None],
+        *,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        slice_size: int = DEFAULT_SLICE_SIZE,
+    ) -> None:
+        self.apply = apply
+        self.slice_size = max(1, slice_size)
+        self.stats = IngestStats()
+        self._queue: asyncio.Queue[Sequence[T] | object] = asyncio.Queue(max(1, max_pending))
+
+    @property
+    def depth(self) -> int:
+        """Batches waiting to be applied."""
+        return self._queue.qsize()
+
+    async def put(self, batch: Sequence[T]) -> None:
+        """Queue ``batch`` from a coroutine, waiting while the queue is full."""
+        if batch:
+            await self._queue.put(batch)
+            depth = self._queue.qsize()
+            self.stats.max_depth = max(self.stats.max_depth, depth)
+            metrics.gauge("queue.ingest", depth)
+
+    def submit(self, batch: Sequence[T], loop: asyncio.AbstractEventLoop) -> None:
+        """Queue ``batch`` from a worker thread, blocking while the queue is full."""
+        asyncio.run_coroutine_threadsafe(self.put(batch), loop).result()
+
+    async def feed(self, batches: Iterable[Sequence[T]]) -> None:
+        """Iterate ``batches`` on a worker thread and queue each one.
+
+        Any parsing done by the iterable - for example a generator decoding
+        lines - therefore runs off the event loop.
+        """
+        loop = asyncio.get_running_loop()
+
+        def produce() -> None:
+            for batch in batches:
+                self.submit(batch, loop)
+
+        await asyncio.to_thread(produce)
+
+    async def close(self) -> None:
+        """Let :meth:`run` return once everything queued so far is applied."""
+        await self._queue.put(_CLOSE)
+
+    async def run(self) -> None:
+        """Apply queued batches slice by slice until :meth:`close` is called."""
+        while True:
+            batch = await self._queue.get()
+            if batch is _CLOSE:
+                return
+            assert isinstance(batch, Sequence)
+            self.stats.batches += 1
+            for start in range(0, len(batch), self.slice_size):
+                chunk = batch[start : start + self.slice_size]
+                with metrics.stage("apply", len(chunk)):
+                    self.apply(chunk)
+                self.stats.items += len(chunk)
+                self.stats.slices += 1
+                await asyncio.sleep(0)
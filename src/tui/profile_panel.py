@@ -0,0 +1,51 @@
+"""Hidden panel showing live instrumentation.
+
+The panel is a :class:`~src.tui.refresh.Widget` that stays blank until it is
+toggled on, typically by a debug key binding. Showing it switches on
+:data:`~src.utils.instrumentation.metrics` collection if nothing else did,
+and hiding it again restores the previous state, so the instrumentation
+only costs anything while someone is looking at it.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Hashable
+
+from src.utils.instrumentation import Metrics, format_report, metrics
+
+
+class ProfilePanel:
+    """Per-stage p50/p99, queue depths, records/s and RSS as a screen region.
+
+    Args:
+        source: Registry to display.
+        visible: Start shown instead of hidden.
+    """
+
+    def __init__(self, source: Metrics = metrics, *, visible: bool = False) -> None:
+        self.metrics = source
+        self.visible = False
+        self._enabled_here = False
+        self._lines: tuple[str, ...] = ()
+        if visible:
+            self.toggle()
+
+    def toggle(self) -> bool:
+        """Show or hide the panel; returns whether it is now visible."""
+        self.visible = not self.visible
+        if self.visible and not self.metrics.enabled:
+            self.metrics.enable()
+            self._enabled_here = True
+        elif not self.visible and self._enabled_here:
+            self.metrics.disable()
+            self._enabled_here = False
+        return self.visible
+
+    def view_model(self) -> Hashable:
+        # The formatted text is the view model: numbers that have not moved
+        # at the displayed precision do not cause a re-render.
+        self._lines = tuple(format_report(self.metrics.snapshot())) if self.visible else ()
+        return self._lines
+
+    def render(self) -> list[str]:
+        return list(self._lines)
@@ -0,0 +1,213 @@
+"""Frame-rate-limited, diffing screen refresh.
+
+Nothing in the TUI draws directly. Widgets are mounted on a
+:class:`RefreshScheduler` at a fixed region of the screen, and anything that
+changes their state - a keypress, a batch of new records - only calls
+:meth:`RefreshScheduler.mark_dirty`. The scheduler folds those calls into at
+most ``max_fps`` frames per second, however many arrive in between.
+
+For each frame every dirty widget is asked for its view model: a cheap,
+hashable snapshot of everything that affects what it draws. A widget whose
+view model equals the one it last drew is skipped without rendering. The
+others are rendered and compared line by line with what is already on
+screen, and only the lines that differ are written out.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass, field
+from itertools import zip_longest
+from typing import Generic, Protocol, TypeVar
+
+from src.tui.virtual_list import VirtualList
+from src.utils.instrumentation import metrics
+
+T = TypeVar("T")
+
+# Changed screen lines of one frame as ``(row, text)`` pairs, top to bottom.
+WriteLines = Callable[[list[tuple[int, str]]], None]
+
+DEFAULT_MAX_FPS = 30.0
+
+_NOTHING_DRAWN = object()
+
+
+class Widget(Protocol):
+    """Something the scheduler can draw into a region of the screen."""
+
+    def view_model(self) -> Hashable:
+        """Snapshot of the state that ``render`` depends on; compared by equality."""
+        ...
+
+    def render(self) -> list[str]:
+        """The widget's lines, top to bottom."""
+        ...
+
+
+class ListWidget(Generic[T]):
+    """:class:`Widget` adapter for a :class:`VirtualList`.
+
+    Rows appended below the viewport leave the view model unchanged, so a
+    list that is not following its tail is not re-rendered while it grows.
+    Call :meth:`touch` when rows already in the source change in place.
+    """
+
+    def __init__(self, view: VirtualList[T]) -> None:
+        self.view = view
+        self.generation = 0
+
+    def touch(self, index: int | None = None) -> None:
+        self.view.invalidate(index)
+        self.generation += 1
+
+    def view_model(self) -> Hashable:
+        view = self.view
+        # Pick up new rows here, once per frame, rather than once per batch.
+        view.refresh()
+        # Every row is at least one line high, so rows past top + height are never visible.
+        visible = min(view.row_count, view.top + view.height)
+        return (view.width, view.height, view.top, view.top_offset, view.cursor, visible, self.generation)
+
+    def render(self) -> list[str]:
+        return self.view.render()
+
+
+@dataclass(slots=True)
+class FrameStats:
+    """Counters describing how much work the scheduler did and avoided."""
+
+    requests: int = 0
+    frames: int = 0
+    rendered: int = 0
+    skipped: int = 0
+    lines_written: int = 0
+
+
+@dataclass(slots=True)
+class _Mount:
+    widget: Widget
+    top: int
+    height: int
+    dirty: bool = True
+    model: object = _NOTHING_DRAWN
+    lines: list[str] = field(default_factory=list)
+
+
+class RefreshScheduler:
+    """Coalesces redraw requests into rate-limited, minimal frames.
+
+    :meth:`mark_dirty` and :meth:`frame` must be called from the thread that
+    runs the event loop; :meth:`run` draws frames on that loop until
+    :meth:`stop` is called.
+
+    Args:
+        write: Receives the changed screen lines of each frame.
+        max_fps: Upper bound on frames drawn per second.
+        clock: Monotonic time source, replaceable in tests.
+    """
+
+    def __init__(
+        self,
+        write: WriteLines,
+        *,
+        max_fps: float = DEFAULT_MAX_FPS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_fps <= 0:
+            raise ValueError(f"max_fps must be positive, not {max_fps}")
+        self.write = write
+        self.interval = 1.0 / max_fps
+        self.clock = clock
+        self.stats = FrameStats()
+        self._mounts: dict[int, _Mount] = {}
+        self._last_frame = float("-inf")
+        self._wake = asyncio.Event()
+        self._running = False
+
+    @property
+    def dirty(self) -> bool:
+        return any(mount.dirty for mount in self._mounts.values())
+
+    @property
+    def next_frame_at(self) -> float:
+        """Earliest time the frame-rate limit allows the next frame."""
+        return self._last_frame + self.interval
+
+    def mount(self, widget: Widget, *, top: int, height: int) -> None:
+        """Show ``widget`` in screen rows ``[top, top + height)``, replacing any earlier placement."""
+        self._mounts[id(widget)] = _Mount(widget, top, height)
+        self._request()
+
+    def unmount(self, widget: Widget) -> None:
+        self._mounts.pop(id(widget), None)
+
+    def mark_dirty(self, widget: Widget | None = None) -> None:
+        """Ask for ``widget`` (or every widget) to be checked in the next frame."""
+        if widget is None:
+            for mount in self._mounts.values():
+                mount.dirty = True
+        else:
+            self._mounts[id(widget)].dirty = True
+        self._request()
+
+    def invalidate(self) -> None:
+        """Forget what is on screen, so the next frame redraws every line."""
+        for mount in self._mounts.values():
+            mount.dirty = True
+            mount.model = _NOTHING_DRAWN
+            mount.lines = []
+        self._request()
+
+    def frame(self) -> int:
+        """Draw one frame now, ignoring the rate limit; returns the lines written."""
+        started = time.perf_counter()
+        changes: list[tuple[int, str]] = []
+        for mount in self._mounts.values():
+            if not mount.dirty:
+                continue
+            mount.dirty = False
+            model = mount.widget.view_model()
+            if model == mount.model:
+                self.stats.skipped += 1
+                continue
+            mount.model = model
+            lines = mount.widget.render()[: mount.height]
+            lines.extend([""] * (mount.height - len(lines)))
+            for row, (old, new) in enumerate(zip_longest(mount.lines, lines)):
+                if old != new:
+                    changes.append((mount.top + row, new))
+            mount.lines = lines
+            self.stats.rendered += 1
+        changes.sort()
+        if changes:
+            self.write(changes)
+        self.stats.frames += 1
+        self.stats.lines_written += len(changes)
+        self._last_frame = self.clock()
+        metrics.record("render", time.perf_counter() - started, len(changes))
+        return len(changes)
+
+    async def run(self) -> None:
+        """Draw a frame whenever something is dirty, at most ``max_fps`` times a second."""
+        self._running = True
+        while self._running:
+            await self._wake.wait()
+            if not self._running:
+                break
+            delay = self.next_frame_at - self.clock()
+            if delay > 0:
+                # Everything marked dirty while we wait lands in this frame.
+                await asyncio.sleep(delay)
+            self._wake.clear()
+            self.frame()
+
+    def stop(self) -> None:
+        self._running = False
+        self._wake.set()
+
+    def _request(self) -> None:
+        self.stats.requests += 1
+        self._wake.set()
@@ -0,0 +1,329 @@
+"""Windowed rendering for long message and log views.
+
+:class:`VirtualList` never materialises the whole session. Rows are fetched
+from a :class:`RowSource` by index only when they enter the viewport (plus
+``overscan`` rows on either side), rendered into wrapped lines, and dropped
+again once they scroll out of the window. The only per-row state kept is the
+measured height of recently seen rows, held in a bounded :class:`HeightCache`.
+
+The scroll position is an anchor - the index of the top row and how many of
+its lines are scrolled off - rather than an absolute line offset. That keeps
+scrolling, paging, jumping and cursor moves proportional to the viewport
+height: none of them needs the heights of rows outside the window, so a view
+over a million messages costs the same as one over a hundred.
+"""
+
+from __future__ import annotations
+
+import textwrap
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Generic, Literal, Protocol, TypeVar
+
+T = TypeVar("T")
+T_co = TypeVar("T_co", covariant=True)
+
+RenderRow = Callable[[T, int], list[str]]
+
+DEFAULT_OVERSCAN = 3
+DEFAULT_HEIGHT_CACHE_SIZE = 4096
+
+
+class RowSource(Protocol[T_co]):
+    """Random-access store of rows; any ``Sequence`` satisfies it."""
+
+    def __len__(self) -> int: ...
+
+    def __getitem__(self, index: int, /) -> T_co: ...
+
+
+def wrap_text(row: object, width: int) -> list[str]:
+    """Default renderer: ``str(row)`` hard-wrapped to ``width`` columns."""
+    lines: list[str] = []
+    for paragraph in str(row).splitlines() or [""]:
+        lines.extend(textwrap.wrap(paragraph, width, replace_whitespace=False) or [""])
+    return lines
+
+
+class HeightCache:
+    """Bounded LRU of measured row heights for a single wrap width.
+
+    Args:
+        capacity: Maximum number of rows to remember. Rows evicted from the
+            cache are simply measured again when they are next needed.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_HEIGHT_CACHE_SIZE) -> None:
+        self.capacity = capacity
+        self.width = 0
+        self._heights: OrderedDict[int, int] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._heights)
+
+    def set_width(self, width: int) -> None:
+        """Switch to ``width``, forgetting heights measured at another width."""
+        if width != self.width:
+            self.width = width
+            self._heights.clear()
+
+    def get(self, index: int) -> int | None:
+        height = self._heights.get(index)
+        if height is not None:
+            self._heights.move_to_end(index)
+        return height
+
+    def put(self, index: int, height: int) -> None:
+        self._heights[index] = height
+        self._heights.move_to_end(index)
+        if len(self._heights) > self.capacity:
+            self._heights.popitem(last=False)
+
+    def invalidate(self, index: int | None = None) -> None:
+        """Forget the height of row ``index``, or of every row."""
+        if index is None:
+            self._heights.clear()
+        else:
+            self._heights.pop(index, None)
+
+
+class VirtualList(Generic[T]):
+    """Viewport over a :class:`RowSource` that renders only what is visible.
+
+    Args:
+        source: Rows to display. Only ``len()`` and indexing are used.
+        render: Turns a row into its wrapped lines for a given width.
+        width: Viewport width in columns.
+        height: Viewport height in lines.
+        overscan: Extra rows rendered above and below the viewport so small
+            scrolls do not need to fetch and wrap new rows.
+        cache_size: Capacity of the row height cache.
+        follow: Keep the view pinned to the last row as the source grows,
+            as long as the user has not scrolled away from the end.
+    """
+
+    def __init__(
+        self,
+        source: RowSource[T],
+        render: RenderRow[T] = wrap_text,
+        *,
+        width: int = 80,
+        height: int = 24,
+        overscan: int = DEFAULT_OVERSCAN,
+        cache_size: int = DEFAULT_HEIGHT_CACHE_SIZE,
+        follow: bool = False,
+    ) -> None:
+        self.source = source
+        self.render_row = render
+        self.overscan = overscan
+        self.follow = follow
+        self.width = max(1, width)
+        self.height = max(1, height)
+        self.heights = HeightCache(cache_size)
+        self.heights.set_width(self.width)
+        self.top = 0
+        self.top_offset = 0
+        self.cursor = 0
+        self._lines: dict[int, list[str]] = {}
+        self._pinned = follow
+        if follow:
+            self.scroll_end()
+
+    # -- geometry ---------------------------------------------------------
+
+    @property
+    def row_count(self) -> int:
+        return len(self.source)
+
+    @property
+    def at_end(self) -> bool:
+        """Whether the last row is fully visible."""
+        return (self.top, self.top_offset) >= self._end_position()
+
+    @property
+    def scroll_fraction(self) -> float:
+        """Approximate scroll position in ``[0, 1]`` for a scrollbar."""
+        if self.at_end:
+            return 1.0
+        return self.top / max(1, self.row_count - 1)
+
+    def row_lines(self, index: int) -> list[str]:
+        """Wrapped lines of row ``index``, rendered on demand."""
+        lines = self._lines.get(index)
+        if lines is None:
+            lines = self.render_row(self.source[index], self.width) or [""]
+            self._lines[index] = lines
+            self.heights.put(index, len(lines))
+        return lines
+
+    def row_height(self, index: int) -> int:
+        """Height of row ``index`` in lines, measuring it if not cached."""
+        height = self.heights.get(index)
+        if height is None:
+            height = len(self.row_lines(index))
+        return height
+
+    def resize(self, width: int, height: int) -> None:
+        """Change the viewport size, re-wrapping rows if the width changed."""
+        width, height = max(1, width), max(1, height)
+        if width != self.width:
+            self.width = width
+            self.heights.set_width(width)
+            self._lines.clear()
+            self.top_offset = 0
+        self.height = height
+        self._settle()
+
+    def invalidate(self, index: int | None = None) -> None:
+        """Re-render row ``index`` (or every row) the next time it is shown."""
+        self.heights.invalidate(index)
+        if index is None:
+            self._lines.clear()
+        else:
+            self._lines.pop(index, None)
+
+    def refresh(self) -> None:
+        """Pick up rows added to or removed from the source."""
+        count = self.row_count
+        self._lines = {i: lines for i, lines in self._lines.items() if i < count}
+        if self.follow and self._pinned:
+            self.scroll_end()
+        else:
+            self._settle()
+
+    # -- scrolling --------------------------------------------------------
+
+    def scroll_by(self, lines: int) -> None:
+        """Scroll down (positive) or up (negative) by ``lines`` lines."""
+        count = self.row_count
+        if count == 0:
+            return
+        offset = self.top_offset + lines
+        top = self.top
+        if lines > 0:
+            end = self._end_position()
+            while (top, 0) < end and offset >= (height := self.row_height(top)):
+                offset -= height
+                top += 1
+            self.top, self.top_offset = min((top, offset), end)
+        else:
+            while offset < 0 and top > 0:
+                top -= 1
+                offset += self.row_height(top)
+            self.top, self.top_offset = top, max(0, offset)
+        self._pinned = self.at_end
+
+    def scroll_page(self, pages: int = 1) -> None:
+        """Scroll by whole viewports, keeping one line of context."""
+        self.scroll_by(pages * max(1, self.height - 1))
+
+    def scroll_to(self, index: int, *, align: Literal["top", "bottom"] = "top") -> None:
+        """Jump so that row ``index`` is at the top or bottom of the viewport."""
+        count = self.row_count
+        if count == 0:
+            return
+        index = min(max(0, index), count - 1)
+        if align == "top":
+            self.top, self.top_offset = min((index, 0), self._end_position())
+        else:
+            self.top, self.top_offset = self._position_ending_at(index)
+        self._pinned = self.at_end
+
+    def scroll_home(self) -> None:
+        self.top = self.top_offset = 0
+        self._pinned = self.at_end
+
+    def scroll_end(self) -> None:
+        self.top, self.top_offset = self._end_position()
+        self._pinned = True
+
+    # -- cursor -----------------------------------------------------------
+
+    def set_cursor(self, index: int) -> None:
+        """Move the cursor to row ``index`` and scroll it into view."""
+        count = self.row_count
+        if count == 0:
+            self.cursor = 0
+            return
+        self.cursor = index = min(max(0, index), count - 1)
+        if index < self.top or (index == self.top and self.top_offset):
+            self.scroll_to(index)
+        elif not self._fully_visible(index):
+            self.scroll_to(index, align="bottom")
+
+    def move_cursor(self, delta: int) -> None:
+        self.set_cursor(self.cursor + delta)
+
+    # -- rendering --------------------------------------------------------
+
+    def window(self) -> list[tuple[int, list[str]]]:
+        """Rows in the viewport plus overscan, as ``(index, lines)`` pairs.
+
+        Rendered lines of rows outside the returned window are released.
+        """
+        count = self.row_count
+        if count == 0:
+            self._lines.clear()
+            return []
+        first = max(0, self.top - self.overscan)
+        rows: list[tuple[int, list[str]]] = []
+        index, used = self.top, -self.top_offset
+        while index < count and used < self.height:
+            used += self.row_height(index)
+            index += 1
+        last = min(count, index + self.overscan)
+        for i in range(first, last):
+            rows.append((i, self.row_lines(i)))
+        self._lines = dict(rows)
+        return rows
+
+    def render(self) -> list[str]:
+        """Exactly :attr:`height` lines for the current viewport."""
+        out: list[str] = []
+        for index, lines in self.window():
+            if index < self.top:
+                continue
+            out.extend(lines[self.top_offset :] if index == self.top else lines)
+            if len(out) >= self.height:
+                break
+        del out[self.height :]
+        out.extend([""] * (self.height - len(out)))
+        return out
+
+    # -- internals --------------------------------------------------------
+
+    def _end_position(self) -> tuple[int, int]:
+        """Scroll anchor at which the last row touches the bottom edge."""
+        count = self.row_count
+        return self._position_ending_at(count - 1) if count else (0, 0)
+
+    def _position_ending_at(self, index: int) -> tuple[int, int]:
+        """Anchor that puts the bottom of row ``index`` on the last line."""
+        remaining = self.height
+        while index >= 0:
+            height = self.row_height(index)
+            if height >= remaining:
+                return index, height - remaining
+            remaining -= height
+            index -= 1
+        return 0, 0
+
+    def _fully_visible(self, index: int) -> bool:
+        used = -self.top_offset
+        for i in range(self.top, index + 1):
+            used += self.row_height(i)
+            if used > self.height:
+                return False
+        return True
+
+    def _settle(self) -> None:
+        """Clamp the anchor and cursor after the source or viewport changed."""
+        count = self.row_count
+        self.cursor = min(self.cursor, max(0, count - 1))
+        if count == 0:
+            self.top = self.top_offset = 0
+            return
+        self.top = min(self.top, count - 1)
+        self.top_offset = min(self.top_offset, self.row_height(self.top) - 1)
+        self.top, self.top_offset = min((self.top, self.top_offset), self._end_position())
+        self._pinned = self.at_end
@@ -0,0 +1,12 @@
+"""Cross-cutting helpers: opt-in instrumentation and profiling."""
+
+from src.utils.instrumentation import Metrics, ProfileDumper, format_report, metrics, peak_rss_bytes, rss_bytes
+
+__all__ = [
+    "Metrics",
+    "ProfileDumper",
+    "format_report",
+    "metrics",
+    "peak_rss_bytes",
+    "rss_bytes",
+]
@@ -0,0 +1,381 @@
+"""Opt-in timers, counters and gauges for the monitor's hot paths.
+
+The pipeline reports into the process-wide :data:`metrics` object under a
+few stage names: ``ingest`` (reading a transcript range into records),
+``parse`` (decoding lines), ``aggregate`` (folding records into summaries and
+rolling windows), ``apply`` (handing ingested records to the UI loop) and
+``render`` (drawing a frame). Stages are timed per batch, never per record,
+and while instrumentation is disabled :meth:`Metrics.stage` returns a shared
+no-op context manager, so the cost is one attribute check per batch.
+
+Each stage keeps a count, the items it processed, its busy time and a
+bounded window of recent durations for percentiles. Gauges track queue
+depths. :meth:`Metrics.snapshot` turns all of it into plain data that
+:meth:`Metrics.to_json` exports and :func:`format_report` prints.
+:class:`ProfileDumper` adds full cProfile and tracemalloc captures that can
+be written out on demand, for example when the process receives a signal.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import cProfile
+import gc
+import json
+import logging
+import marshal
+import math
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import FrameType, TracebackType
+from typing import Any, Self
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLES = 2048
+TRACEMALLOC_FRAMES = 16
+TOP_ALLOCATIONS = 25
+
+_NULL_TIMER: AbstractContextManager[None] = contextlib.nullcontext()
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process (peak RSS where that is unavailable)."""
+    try:
+        with open("/proc/self/statm", "rb") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        # No procfs (macOS) or no os.sysconf (Windows).
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    """Highest resident set size this process has reached, or 0 where it cannot be read (Windows)."""
+    try:
+        # Unlike ru_maxrss, VmHWM is not carried over from the parent across fork and exec.
+        with open("/proc/self/status", "rb") as fh:
+            for line in fh:
+                if line.startswith(b"VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - Windows
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _percentile(ordered: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+@dataclass(slots=True)
+class StageStats:
+    """Accumulated timings of one stage."""
+
+    count: int = 0
+    items: int = 0
+    busy: float = 0.0
+    max: float = 0.0
+    samples: deque[float] = field(default_factory=lambda: deque(maxlen=DEFAULT_SAMPLES))
+
+    def add(self, seconds: float, items: int) -> None:
+        self.count += 1
+        self.items += items
+        self.busy += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def summary(self, elapsed: float) -> dict[str, float]:
+        ordered = sorted(self.samples)
+        return {
+            "count": self.count,
+            "items": self.items,
+            "busy_s": self.busy,
+            "p50_ms": _percentile(ordered, 0.50) * 1000 if ordered else 0.0,
+            "p99_ms": _percentile(ordered, 0.99) * 1000 if ordered else 0.0,
+            "max_ms": self.max * 1000,
+            "items_per_s": self.items / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+@dataclass(slots=True)
+class GaugeStats:
+    last: float = 0.0
+    max: float = 0.0
+
+
+class _StageTimer:
+    __slots__ = ("items", "metrics", "name", "start")
+
+    def __init__(self, metrics: Metrics, name: str, items: int) -> None:
+        self.metrics = metrics
+        self.name = name
+        self.items = items
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, tb: TracebackType | None
+    ) -> None:
+        self.metrics.record(self.name, time.perf_counter() - self.start, self.items)
+
+
+class Metrics:
+    """Registry of stage timers, counters and gauges; disabled until :meth:`enable`."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._stages: dict[str, StageStats] = {}
+        self._counters: dict[str, int] = {}
+        self._gauges: dict[str, GaugeStats] = {}
+
+    def enable(self, *, reset: bool = True) -> None:
+        if reset:
+            self.reset()
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started = time.monotonic()
+            self._stages.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def stage(self, name: str, items: int = 1) -> AbstractContextManager[None]:
+        """Time the ``with`` block as one batch of ``items`` for stage ``name``."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, name, items)
+
+    def record(self, name: str, seconds: float, items: int = 1) -> None:
+        """Add an externally measured batch to stage ``name``."""
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = StageStats()
+            stats.add(seconds, items)
+
+    def count(self, name: str, n: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def gauge(self, name: str, value: float) -> None:
+        """Set gauge ``name`` (e.g. a queue depth), remembering its maximum."""
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._gauges.get(name)
+            if stats is None:
+                stats = self._gauges[name] = GaugeStats()
+            stats.last = value
+            stats.max = max(stats.max, value)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Everything collected so far as JSON-compatible data."""
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            return {
+                "enabled": self.enabled,
+                "elapsed_s": elapsed,
+                "rss_bytes": rss_bytes(),
+                "peak_rss_bytes": peak_rss_bytes(),
+                "stages": {name: stats.summary(elapsed) for name, stats in sorted(self._stages.items())},
+                "counters": dict(sorted(self._counters.items())),
+                "gauges": {name: {"last": g.last, "max": g.max} for name, g in sorted(self._gauges.items())},
+            }
+
+    def to_json(self, *, indent: int | None = None) -> str:
+        return json.dumps(self.snapshot(), indent=indent)
+
+
+metrics = Metrics()
+
+
+def format_report(snapshot: dict[str, Any]) -> list[str]:
+    """Human-readable table of a :meth:`Metrics.snapshot`."""
+    lines = [
+        (
+            f"elapsed {snapshot['elapsed_s']:.1f}s  rss {snapshot['rss_bytes'] / 2**20:.1f} MB  "
+            f"peak {snapshot['peak_rss_bytes'] / 2**20:.1f} MB"
+        ),
+        f"{'stage':<12}{'count':>9}{'items':>11}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'items/s':>11}",
+    ]
+    for name, s in snapshot["stages"].items():
+        lines.append(
+            f"{name:<12}{s['count']:>9,}{s['items']:>11,}{s['p50_ms']:>9.2f}{s['p99_ms']:>9.2f}"
+            f"{s['max_ms']:>9.2f}{s['items_per_s']:>11,.0f}"
+        )
+    for name, g in snapshot["gauges"].items():
+        lines.append(f"{name:<12} last {g['last']:,.0f}  max {g['max']:,.0f}")
+    for name, value in snapshot["counters"].items():
+        lines.append(f"{name:<12} {value:,}")
+    return lines
+
+
+class ProfileDumper:
+    """Writes metrics, cProfile stats and tracemalloc snapshots to ``directory``.
+
+    Args:
+        directory: Where dumps are written; created on first dump.
+        metrics: Registry whose snapshot is included in every dump.
+        cpu: Run a :mod:`cProfile` profiler between :meth:`start` and
+            :meth:`stop`.
+        memory: Trace allocations with :mod:`tracemalloc` between
+            :meth:`start` and :meth:`stop`.
+    """
+
+    def __init__(self, directory: Path, metrics: Metrics = metrics, *, cpu: bool = True, memory: bool = True) -> None:
+        self.directory = directory
+        self.metrics = metrics
+        self.cpu = cpu
+        self.memory = memory
+        self._profiler: cProfile.Profile | None = None
+        self._started_tracing = False
+        self._previous_handler: Callable[[int, FrameType | None], Any] | int | None = None
+        self._signum: int | None = None
+        self._dumps = 0
+        self._dump_lock = threading.Lock()
+        self._requested = threading.Event()
+        self._closing = False
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, tb: TracebackType | None
+    ) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        if self.cpu and self._profiler is None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracing = True
+
+    def stop(self) -> None:
+        # Restore the handler before touching the event it sets, and let a
+        # requested dump finish before the captures it reads go away.
+        if self._signum is not None:
+            previous = signal.SIG_DFL if self._previous_handler is None else self._previous_handler
+            signal.signal(self._signum, previous)
+            self._signum = None
+        if self._thread is not None:
+            self._closing = True
+            self._requested.set()
+            self._thread.join()
+            self._thread = None
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def dump(self) -> list[Path]:
+        """Write everything captured so far; capturing continues afterwards.
+
+        File names carry the pid, the time to the millisecond and a sequence
+        number, so a signal-triggered dump never overwrites the one on exit.
+        Dumps may be taken from any thread; concurrent ones are serialized.
+        """
+        with self._dump_lock:
+            return self._dump()
+
+    def _dump(self) -> list[Path]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._dumps += 1
+        now = time.time()
+        stamp = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{int(now * 1000) % 1000:03d}"
+        stem = self.directory / f"ccmonitor-{os.getpid()}-{stamp}-{self._dumps}"
+        written = [stem.with_suffix(".json")]
+        written[0].write_text(self.metrics.to_json(indent=2), encoding="utf-8")
+        if self._profiler is not None:
+            path = stem.with_suffix(".pstats")
+            self._snapshot_profile(self._profiler)
+            with open(path, "wb") as fh:
+                marshal.dump(self._profiler.stats, fh)
+            written.append(path)
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            path = stem.with_suffix(".tracemalloc")
+            snapshot.dump(str(path))
+            top = snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+            summary = stem.with_suffix(".tracemalloc.txt")
+            summary.write_text("".join(f"{stat}\n" for stat in top), encoding="utf-8")
+            written += [path, summary]
+        logger.info("Wrote profile dump %s", ", ".join(str(p) for p in written))
+        return written
+
+    @staticmethod
+    def _snapshot_profile(profiler: cProfile.Profile) -> None:
+        """Fill ``profiler.stats`` without disabling it.
+
+        dump_stats() would disable the profiler, which only acts on the
+        calling thread, and dumps may come from the dumper thread. Reading
+        the stats while the profiled thread adds to them is safe as long as
+        this thread keeps the GIL, so no collection may run finalizers here.
+        """
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            profiler.snapshot_stats()
+        finally:
+            if collecting:
+                gc.enable()
+
+    def install_signal(self, signum: int | None = None) -> None:
+        """Dump whenever the process receives ``signum`` (default ``SIGUSR1``; main thread only).
+
+        A dump takes locks the interrupted code may hold, so the handler only
+        wakes a background thread that writes it. Signals that arrive while a
+        dump is being written are folded into one more dump.
+        """
+        if signum is None:
+            signum = signal.SIGUSR1
+        if self._thread is None:
+            self._closing = False
+            self._requested.clear()
+            self._thread = threading.Thread(target=self._serve, name="ccmonitor-profile-dumper", daemon=True)
+            self._thread.start()
+        self._previous_handler = signal.signal(signum, lambda _signum, _frame: self._requested.set())
+        self._signum = signum
+
+    def _serve(self) -> None:
+        while True:
+            self._requested.wait()
+            self._requested.clear()
+            if self._closing:
+                return
+            try:
+                self.dump()
+            except Exception:
+                logger.exception("Profile dump failed")
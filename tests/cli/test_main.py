@@ -0,0 +1,73 @@
+"""``ccmonitor sessions`` and ``ccmonitor show`` backed by the session index."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from src.cli.main import main
+from tests.factories import write_log
+
+
+@pytest.fixture
+def projects(tmp_path: Path) -> Path:
+    write_log(tmp_path / "projects" / "app" / "a.jsonl", 3, session_id="alpha")
+    write_log(tmp_path / "projects" / "lib" / "b.jsonl", 600, session_id="beta")
+    return tmp_path / "projects"
+
+
+def _run(tmp_path: Path, projects: Path, *argv: str) -> int:
+    return main(["--projects", str(projects), "--index", str(tmp_path / "index.db"), *argv])
+
+
+def test_sessions_lists_every_transcript(tmp_path: Path, projects: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    assert _run(tmp_path, projects, "sessions") == 0
+    out = capsys.readouterr().out.splitlines()
+    assert len(out) == 2
+    assert out[0].startswith("beta") and "600 records" in out[0]
+    assert out[1].startswith("alpha")
+
+
+def test_show_seeks_into_transcript(tmp_path: Path, projects: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    path = projects / "lib" / "b.jsonl"
+    assert _run(tmp_path, projects, "show", str(path), "--at", "300", "--count", "2") == 0
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [r["timestamp"] for r in records] == ["2026-01-01T00:05:00Z", "2026-01-01T00:05:01Z"]
+
+    assert _run(tmp_path, projects, "show", str(path), "--at", "-1") == 0
+    assert json.loads(capsys.readouterr().out)["timestamp"] == "2026-01-01T00:09:59Z"
+
+
+def test_show_missing_file(tmp_path: Path, projects: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    assert _run(tmp_path, projects, "show", str(tmp_path / "nope.jsonl")) == 1
+    assert "no such file" in capsys.readouterr().err
+
+
+def test_backfill_indexes_in_parallel(tmp_path: Path, projects: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    assert _run(tmp_path, projects, "backfill", "--jobs", "2", "--no-progress") == 0
+    assert capsys.readouterr().out.strip() == "indexed 2 files, 603 records"
+    assert _run(tmp_path, projects, "backfill") == 0
+    assert capsys.readouterr().out.strip() == "indexed 0 files, 0 records"
+
+
+@pytest.mark.parametrize("jobs", ["0", "-1", "two"])
+def test_backfill_rejects_invalid_job_counts(
+    tmp_path: Path, projects: Path, capsys: pytest.CaptureFixture[str], jobs: str
+) -> None:
+    with pytest.raises(SystemExit) as exc:
+        _run(tmp_path, projects, "backfill", "--jobs", jobs)
+    assert exc.value.code == 2
+    assert "--jobs" in capsys.readouterr().err
+
+
+def test_profile_reports_stages_and_writes_dumps(
+    tmp_path: Path, projects: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    assert _run(tmp_path, projects, "--profile-dir", str(tmp_path / "profile"), "sessions") == 0
+    err = capsys.readouterr().err
+    for stage in ("ingest", "parse", "aggregate"):
+        assert any(line.startswith(stage) for line in err.splitlines())
+    (dump,) = (tmp_path / "profile").glob("*.json")
+    assert json.loads(dump.read_text())["stages"]["ingest"]["items"] == 603
@@ -0,0 +1,134 @@
+"""RollingAggregator against a naive recomputation over the raw records."""
+
+from __future__ import annotations
+
+import math
+
+import pytest
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from src.core.aggregation import RING_BLOCKS, RollingAggregator, Totals, parse_timestamp
+from src.core.records import LogRecord
+
+BASE = 1_700_000_000
+# Small rings so generated histories wrap them many times.
+RESOLUTIONS = ((1, 50), (10, 30), (100, 40))
+
+Event = tuple[float, str, str, str, int, int, int]
+
+events = st.lists(
+    st.tuples(
+        st.floats(min_value=0, max_value=6000, allow_nan=False),
+        st.sampled_from(["s1", "s2", "s3"]),
+        st.sampled_from(["opus", "sonnet"]),
+        st.sampled_from(["p1", "p2"]),
+        st.integers(0, 1000),
+        st.integers(0, 1000),
+        st.integers(0, 5_000_000),
+    ),
+    max_size=300,
+)
+queries = st.lists(
+    st.tuples(
+        st.integers(-500, 6500),
+        st.integers(1, 7000),
+        st.sampled_from([{}, {"session": "s1"}, {"model": "opus"}, {"project": "p2"}, {"session": "nope"}]),
+    ),
+    min_size=1,
+    max_size=20,
+)
+
+
+def _record(session: str, model: str, input_tokens: int, output_tokens: int, cost_nanos: int) -> LogRecord:
+    return LogRecord(
+        b"{}",
+        type="assistant",
+        session_id=session,
+        model=model,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        cost_nanos=cost_nanos,
+    )
+
+
+def _naive(history: list[Event], start: int, end: int, key: dict[str, str]) -> Totals:
+    totals = Totals()
+    for t, session, model, project, inp, out, cost in history:
+        fields = {"session": session, "model": model, "project": project}
+        if all(fields[k] == v for k, v in key.items()) and start <= math.floor(BASE + t) < end:
+            totals.add(_record(session, model, inp, out, cost))
+    return totals
+
+
+@settings(max_examples=200, deadline=None)
+@given(history=events, windows=queries)
+def test_windows_match_naive_recomputation(history: list[Event], windows: list[tuple[int, int, dict]]) -> None:
+    agg = RollingAggregator(RESOLUTIONS)
+    for t, session, model, project, inp, out, cost in history:
+        agg.add(_record(session, model, inp, out, cost), project=project, when=BASE + t)
+    for offset, length, key in windows:
+        start, end = BASE + offset, BASE + offset + length
+        lower, upper = agg.effective_window(start, end, **key)
+        assert lower <= upper
+        assert agg.window(start, end, **key) == _naive(history, lower, upper, key)
+
+
+@settings(max_examples=100, deadline=None)
+@given(history=events)
+def test_recent_windows_are_exact(history: list[Event]) -> None:
+    agg = RollingAggregator(RESOLUTIONS)
+    for t, session, model, project, inp, out, cost in history:
+        agg.add(_record(session, model, inp, out, cost), project=project, when=BASE + t)
+    if not history:
+        return
+    now = BASE + max(t for t, *_ in history)
+    # Within the finest ring's span the window is never rounded.
+    end = math.floor(now) + 1
+    assert agg.effective_window(end - 50, end) == (end - 50, end)
+    assert agg.last(50, now=now) == _naive(history, end - 50, end, {})
+
+
+def test_memory_is_bounded_by_buckets() -> None:
+    agg = RollingAggregator(RESOLUTIONS)
+    for i in range(20_000):
+        agg.add(_record(f"s{i // 100}", "opus", 1, 1, 1), when=BASE + i)
+    for ring, (_, size) in zip(agg._series[("all", None)].rings, RESOLUTIONS, strict=True):
+        assert size <= len(ring) < size + 2 * (size // RING_BLOCKS)
+    # Sessions that fell out of the retention period are dropped.
+    agg.prune()
+    assert len(agg.keys("session")) <= agg.retention // 100 + 1
+
+
+def test_short_lived_series_only_hold_the_buckets_they_use() -> None:
+    agg = RollingAggregator()
+    for i in range(200):
+        agg.add(_record(f"s{i}", "opus", 1, 1, 1), when=BASE + 7 * i)
+    series = agg._series[("session", "s42")]
+    assert [len(ring) for ring in series.rings] == [1, 1, 1]
+    assert agg.window(BASE, BASE + 1400, session="s42").records == 1
+    assert agg.last(3600, now=BASE + 1400).records == 200
+
+
+def test_timestamps_and_filters() -> None:
+    assert parse_timestamp("2026-01-01T00:00:00Z") == parse_timestamp("2026-01-01T01:00:00+01:00")
+    assert parse_timestamp("yesterday") is None and parse_timestamp(None) is None
+    agg = RollingAggregator()
+    agg.add(LogRecord(b"{}", timestamp="2026-01-01T00:00:00.500Z", model="opus", input_tokens=5))
+    agg.add(LogRecord(b"{}", input_tokens=7))
+    assert agg.undated == 1
+    ts = parse_timestamp("2026-01-01T00:00:00Z")
+    assert ts is not None and agg.last(60, now=ts, model="opus").input_tokens == 5
+    assert agg.keys("model") == ["opus"]
+    with pytest.raises(TypeError):
+        agg.window(0, 1, model="opus", session="s")
+    with pytest.raises(ValueError, match="divide"):
+        RollingAggregator(((1, 10), (15, 10), (40, 10)))
+    with pytest.raises(ValueError, match="far enough"):
+        RollingAggregator(((1, 60), (60, 2), (3600, 10)))
+
+
+def test_per_minute_rates() -> None:
+    totals = Totals(records=10, input_tokens=600, cost_nanos=3_000)
+    rate = totals.per_minute(300)
+    assert (rate.records, rate.input_tokens, rate.cost_nanos) == (2, 120, 600)
@@ -0,0 +1,113 @@
+"""RecordDecoder backends, the type pre-filter and lazy record bodies."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from src.core.records import LogRecord, RecordDecoder, available_backends, parse_object
+from tests.factories import record_dict, record_line
+
+BACKENDS = available_backends()
+HOT_FIELDS = [name for name in LogRecord.__slots__ if not name.startswith("_")]
+
+TRICKY_LINES = [
+    record_line(),
+    record_line(type="user", model=None, cost_usd=None, session_id=None, timestamp=None),
+    b'{"type":"summary","summary":"Refactor","leafUuid":"x"}',
+    b"",
+    b"   ",
+    b"[1, 2]",
+    b'"assistant"',
+    b"{broken",
+    b'{"type":"user","message":"plain string body"}',
+    b'{"type":"assistant","message":{"model":7,"usage":"n/a"}}',
+    b'{"type":"assistant","message":{"usage":{"input_tokens":true,"output_tokens":1.5}}}',
+    b'{"type":"assistant","costUSD":NaN,"timestamp":123}',
+    b'{"type":"assistant","costUSD":2,"message":null}',
+    b'{"type": "assistant", "sessionId": "spaced", "message": {"content": [{"type": "user"}]}}',
+    b'{"message":{"content":[{"type":"assistant"}]},"type":"system"}',
+    # Integers beyond 64 bits, which orjson reads as floats.
+    b'{"type":"assistant","costUSD":18446744073709551616,"message":{"usage":{"input_tokens":1180591620717411303424}}}',
+    b'{"type":"assistant","message":{"usage":{"output_tokens":-9223372036854775809,"cache_read_input_tokens":1e30}}}',
+]
+
+
+def _decode_all(decoder: RecordDecoder) -> list[tuple | None]:
+    out = []
+    for line in TRICKY_LINES:
+        record = decoder.decode(line)
+        out.append(None if record is None else tuple(getattr(record, f) for f in HOT_FIELDS))
+    return out
+
+
+@pytest.mark.parametrize("types", [None, {"assistant", "user"}], ids=["all", "filtered"])
+def test_backends_agree(types: set[str] | None) -> None:
+    results = {}
+    for backend in BACKENDS:
+        decoder = RecordDecoder(types, backend=backend)
+        results[backend] = (_decode_all(decoder), decoder.skipped, decoder.malformed)
+    assert all(r == results["json"] for r in results.values())
+
+
+def test_hot_fields() -> None:
+    line = record_line(input_tokens=3, output_tokens=4, cache_creation_tokens=5, cache_read_tokens=6, cost_usd=0.25)
+    record = RecordDecoder().decode(line)
+    assert record is not None
+    assert (record.type, record.timestamp, record.session_id, record.model) == (
+        "assistant",
+        "2026-01-01T00:00:00Z",
+        "session-1",
+        "claude-sonnet",
+    )
+    assert record.total_tokens == 18
+    assert record.cost_usd == 0.25 and record.cost_nanos == 250_000_000
+
+
+def test_prefilter_skips_other_types_and_checks_top_level_type() -> None:
+    decoder = RecordDecoder({"assistant"})
+    assert decoder.decode(record_line(type="user")) is None
+    # Nested "type":"assistant" passes the byte filter but not the real check.
+    assert decoder.decode(b'{"type":"system","message":{"content":[{"type":"assistant"}]}}') is None
+    assert decoder.decode(record_line()) is not None
+    assert (decoder.skipped, decoder.malformed) == (2, 0)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_body_is_decoded_lazily(backend: str) -> None:
+    line = json.dumps(
+        record_dict(text="hi")
+        | {"message": {"content": [{"type": "tool_use", "name": "Bash", "input": {"command": "ls"}}]}}
+    ).encode()
+    record = RecordDecoder(backend=backend).decode(line)
+    assert record is not None and record._data is None
+    assert [block["name"] for block in record.tool_uses] == ["Bash"]
+    assert record.data == json.loads(line)
+    record.release()
+    assert record._data is None and record.message is not None
+
+
+@pytest.mark.parametrize("keep_data", [False, True])
+def test_backends_agree_on_bodies_with_integers_beyond_64_bits(keep_data: bool) -> None:
+    line = json.dumps(record_dict(text="hi") | {"uuid": 2**64, "parentUuid": -(2**63) - 1}).encode()
+    for backend in BACKENDS:
+        record = RecordDecoder(backend=backend, keep_data=keep_data).decode(line)
+        assert record is not None and record.data == json.loads(line)
+    assert parse_object(line) == json.loads(line)
+
+
+def test_plain_string_content_becomes_text_block() -> None:
+    record = RecordDecoder().decode(b'{"type":"user","message":{"role":"user","content":"hi"}}')
+    assert record is not None and record.content == [{"type": "text", "text": "hi"}]
+
+
+def test_parse_object() -> None:
+    assert parse_object(record_line()) == record_dict()
+    assert parse_object(b"[1]") is None and parse_object(b"{nope") is None
+    assert parse_object(b'{"cost": NaN}') is not None
+
+
+def test_unknown_backend_is_rejected() -> None:
+    with pytest.raises(ValueError, match="not available"):
+        RecordDecoder(backend="simdjson")  # type: ignore[arg-type]
@@ -0,0 +1,64 @@
+"""Builders for synthetic Claude Code log lines used across the test suite."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+
+def record_dict(
+    *,
+    type: str = "assistant",
+    timestamp: str | None = "2026-01-01T00:00:00Z",
+    session_id: str | None = "session-1",
+    model: str | None = "claude-sonnet",
+    input_tokens: int = 10,
+    output_tokens: int = 20,
+    cache_creation_tokens: int = 0,
+    cache_read_tokens: int = 0,
+    cost_usd: float | None = 0.001,
+    text: str = "hello",
+) -> dict[str, Any]:
+    obj: dict[str, Any] = {"type": type}
+    if timestamp is not None:
+        obj["timestamp"] = timestamp
+    if session_id is not None:
+        obj["sessionId"] = session_id
+    obj["message"] = {
+        "role": "assistant" if type == "assistant" else "user",
+        "model": model,
+        "content": [{"type": "text", "text": text}],
+        "usage": {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cache_creation_input_tokens": cache_creation_tokens,
+            "cache_read_input_tokens": cache_read_tokens,
+        },
+    }
+    if cost_usd is not None:
+        obj["costUSD"] = cost_usd
+    return obj
+
+
+def record_line(**kwargs: Any) -> bytes:
+    """One newline-terminated JSONL line; see :func:`record_dict` for the fields."""
+    return json.dumps(record_dict(**kwargs), separators=(",", ":")).encode() + b"\n"
+
+
+def write_log(path: Path, count: int, **kwargs: Any) -> Path:
+    """Write ``count`` records with increasing timestamps and costs to ``path``."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lines = (
+        record_line(
+            timestamp=f"2026-01-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z",
+            input_tokens=i % 97,
+            output_tokens=i % 31,
+            cost_usd=round(0.001 * (i % 13) + 0.0001, 6),
+            **kwargs,
+        )
+        for i in range(count)
+    )
+    with open(path, "wb") as fh:
+        fh.writelines(lines)
+    return path
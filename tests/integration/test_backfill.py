@@ -0,0 +1,116 @@
+"""Parallel backfill produces the same index as sequential indexing."""
+
+from __future__ import annotations
+
+import importlib
+import itertools
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from src.services.backfill import BackfillProgress, Chunk, backfill, plan_chunks
+from src.services.index import SessionIndex
+from tests.factories import record_line, write_log
+
+# The package re-exports backfill(), which shadows the module attribute.
+backfill_module = importlib.import_module("src.services.backfill")
+
+
+@pytest.fixture
+def projects(tmp_path: Path) -> Path:
+    root = tmp_path / "projects"
+    write_log(root / "a" / "big.jsonl", 3000)
+    write_log(root / "a" / "small.jsonl", 7, session_id="other")
+    (root / "b").mkdir()
+    (root / "b" / "empty.jsonl").touch()
+    with open(root / "b" / "messy.jsonl", "wb") as fh:
+        fh.write(record_line(text="x") + b"\n{broken\n" + record_line(text="y") + record_line()[:30])
+    return root
+
+
+def _dump(db: Path) -> tuple[list[tuple], list[tuple]]:
+    with sqlite3.connect(db) as conn:
+        files = conn.execute("SELECT * FROM files ORDER BY path").fetchall()
+        checkpoints = conn.execute("SELECT * FROM checkpoints ORDER BY path, record").fetchall()
+    return files, checkpoints
+
+
+def test_plan_chunks_splits_at_line_starts(tmp_path: Path) -> None:
+    path = write_log(tmp_path / "s.jsonl", 500)
+    size = path.stat().st_size
+    chunks = plan_chunks(path, size, chunk_size=10_000)
+    assert len(chunks) > 5
+    assert chunks[0].start == 0 and chunks[-1].end == size
+    data = path.read_bytes()
+    for prev, nxt in itertools.pairwise(chunks):
+        assert prev.end == nxt.start and data[nxt.start - 1 : nxt.start] == b"\n"
+    assert plan_chunks(path, 0) == [Chunk(path, 0, 0)]
+
+
+@pytest.mark.parametrize("jobs", [1, 3])
+def test_summaries_match_sequential_refresh(tmp_path: Path, projects: Path, jobs: int) -> None:
+    big = projects / "a" / "big.jsonl"
+    with SessionIndex(tmp_path / "seq.db", stride=16) as seq:
+        expected = {s.path: s for s in seq.refresh_all([projects])}
+        expected_records = seq.read_records(big, 1234, 20)
+    with SessionIndex(tmp_path / "par.db", stride=16) as par:
+        done = backfill(par, [projects], jobs=jobs, chunk_size=4096)
+        assert [s.path for s in done] == sorted(expected)
+        for summary in done:
+            assert summary == expected[summary.path]
+        assert par.read_records(big, 1234, 20) == expected_records
+
+
+@pytest.mark.parametrize("jobs", [1, 2, 4])
+def test_database_matches_sequential_refresh(tmp_path: Path, projects: Path, jobs: int) -> None:
+    with SessionIndex(tmp_path / "seq.db", stride=16) as seq:
+        seq.refresh_all([projects])
+    expected = _dump(tmp_path / "seq.db")
+    assert len(expected[1]) > 3000 // 16
+    with SessionIndex(tmp_path / "par.db", stride=16) as par:
+        backfill(par, [projects], jobs=jobs, chunk_size=4096)
+    assert _dump(tmp_path / "par.db") == expected
+
+
+def test_skips_fresh_files_and_reports_progress(tmp_path: Path, projects: Path) -> None:
+    reports: list[tuple[int, int]] = []
+
+    def progress(p: BackfillProgress) -> None:
+        reports.append((p.files, p.bytes))
+        assert p.bytes <= p.total_bytes
+
+    with SessionIndex(tmp_path / "index.db") as index:
+        assert len(backfill(index, [projects], jobs=2, chunk_size=4096, progress=progress)) == 4
+        assert reports[-1][0] == 4 and reports == sorted(reports)
+        assert backfill(index, [projects], jobs=2) == []
+        assert len(backfill(index, [projects], jobs=2, force=True)) == 4
+        # A backfilled file keeps being indexed incrementally.
+        with open(projects / "a" / "small.jsonl", "ab") as fh:
+            fh.write(record_line())
+        summary = index.refresh(projects / "a" / "small.jsonl")
+        assert summary is not None and summary.record_count == 8
+
+
+def test_drops_deleted_files_and_tolerates_vanishing_ones(
+    tmp_path: Path, projects: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    with SessionIndex(tmp_path / "index.db") as index:
+        backfill(index, [projects], jobs=1)
+        (projects / "a" / "small.jsonl").unlink()
+        assert backfill(index, [projects], jobs=1) == []
+        assert index.summary(projects / "a" / "small.jsonl") is None
+
+        # A file deleted between listing the directory and planning its chunks is skipped.
+        gone = write_log(projects / "b" / "gone.jsonl", 5)
+        planned = backfill_module.plan_chunks
+
+        def plan_after_delete(path: Path, size: int, chunk_size: int) -> list[Chunk]:
+            if path == gone:
+                gone.unlink()
+            return planned(path, size, chunk_size)
+
+        monkeypatch.setattr(backfill_module, "plan_chunks", plan_after_delete)
+        assert backfill(index, [projects], jobs=1) == []
+        assert index.summary(gone) is None
+        assert sorted(s.path.name for s in index.sessions()) == ["big.jsonl", "empty.jsonl", "messy.jsonl"]
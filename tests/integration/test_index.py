@@ -0,0 +1,131 @@
+"""SessionIndex against real files: summaries, checkpoints and incremental updates."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+from src.services.index import IndexedTranscript, SessionIndex
+from tests.factories import record_line, write_log
+
+
+def _append(path: Path, data: bytes) -> None:
+    with open(path, "ab") as fh:
+        fh.write(data)
+
+
+def _texts(records: list[dict]) -> list[str]:
+    return [r["message"]["content"][0]["text"] for r in records]
+
+
+@pytest.fixture
+def index(tmp_path: Path) -> SessionIndex:
+    return SessionIndex(tmp_path / "index.db", stride=4)
+
+
+def test_summary_aggregates_records(tmp_path: Path, index: SessionIndex) -> None:
+    path = tmp_path / "s.jsonl"
+    _append(path, record_line(timestamp="2026-01-01T00:00:05Z", input_tokens=1, output_tokens=2, cost_usd=0.5))
+    _append(path, b"\nnot json\n")
+    _append(path, record_line(timestamp="2026-01-01T00:00:01Z", cache_read_tokens=7, cost_usd=0.25))
+    summary = index.refresh(path)
+    assert summary is not None
+    assert (summary.line_count, summary.record_count, summary.malformed) == (4, 2, 1)
+    assert (summary.first_timestamp, summary.last_timestamp) == ("2026-01-01T00:00:01Z", "2026-01-01T00:00:05Z")
+    assert (summary.input_tokens, summary.output_tokens, summary.cache_read_tokens) == (11, 22, 7)
+    assert summary.total_tokens == 40
+    assert summary.cost_usd == pytest.approx(0.75)
+    assert summary.session_id == "session-1"
+
+
+def test_read_records_seeks_from_nearest_checkpoint(tmp_path: Path, index: SessionIndex) -> None:
+    path = tmp_path / "s.jsonl"
+    for i in range(50):
+        _append(path, record_line(text=str(i)))
+    index.refresh(path)
+    assert index.checkpoint(path, 0) == (0, 0)
+    record, offset = index.checkpoint(path, 23)
+    assert record == 20 and offset == len(record_line(text="0")) * 10 + len(record_line(text="10")) * 10
+    assert _texts(index.read_records(path, 23, 3)) == ["23", "24", "25"]
+    assert _texts(index.read_records(path, 48, 10)) == ["48", "49"]
+    assert index.read_records(path, 60, 1) == []
+
+
+def test_append_is_indexed_incrementally(tmp_path: Path, index: SessionIndex) -> None:
+    path = write_log(tmp_path / "s.jsonl", 10)
+    index.refresh(path)
+    partial = record_line(text="new")
+    _append(path, partial[:15])
+    summary = index.refresh(path)
+    assert summary is not None and summary.record_count == 10
+    _append(path, partial[15:] + record_line(text="newer"))
+    summary = index.refresh(path)
+    assert summary is not None and (summary.record_count, summary.line_count) == (12, 12)
+    assert _texts(index.read_records(path, 9, 3))[1:] == ["new", "newer"]
+    assert index.checkpoint(path, 11)[0] == 8
+
+
+def test_truncation_and_replacement_reindex(tmp_path: Path, index: SessionIndex) -> None:
+    path = write_log(tmp_path / "s.jsonl", 10)
+    index.refresh(path)
+    write_log(path, 3)
+    summary = index.refresh(path)
+    assert summary is not None and summary.record_count == 3
+    assert index.checkpoint(path, 8) == (0, 0)
+
+    replacement = tmp_path / "new.jsonl"
+    write_log(replacement, 30, text="replaced")
+    os.replace(replacement, path)
+    summary = index.refresh(path)
+    assert summary is not None and summary.record_count == 30
+    assert _texts(index.read_records(path, 29, 1)) == ["replaced"]
+
+
+def test_index_persists_and_drops_vanished_files(tmp_path: Path) -> None:
+    a = write_log(tmp_path / "logs" / "a.jsonl", 5)
+    b = write_log(tmp_path / "logs" / "sub" / "b.jsonl", 7)
+    with SessionIndex(tmp_path / "index.db") as index:
+        assert {s.path for s in index.refresh_all([tmp_path / "logs"])} == {a, b}
+    with SessionIndex(tmp_path / "index.db") as index:
+        summary = index.summary(b)
+        assert summary is not None and summary.record_count == 7
+        b.unlink()
+        assert [s.path for s in index.refresh_all([tmp_path / "logs"])] == [a]
+
+
+def test_stride_change_rebuilds_index(tmp_path: Path) -> None:
+    path = write_log(tmp_path / "s.jsonl", 10)
+    with SessionIndex(tmp_path / "index.db", stride=4) as index:
+        index.refresh(path)
+    with SessionIndex(tmp_path / "index.db", stride=8) as index:
+        assert index.summary(path) is None
+        index.refresh(path)
+        assert index.checkpoint(path, 7) == (0, 0)
+
+
+def test_indexed_transcript_random_access(tmp_path: Path, index: SessionIndex) -> None:
+    path = tmp_path / "s.jsonl"
+    for i in range(10):
+        _append(path, record_line(text=str(i)))
+    rows = IndexedTranscript(index, path, cache_blocks=2)
+    assert len(rows) == 10
+    assert [rows[i]["message"]["content"][0]["text"] for i in (9, 0, 5, -1)] == ["9", "0", "5", "9"]
+    with pytest.raises(IndexError):
+        rows[10]
+    _append(path, record_line(text="10"))
+    assert rows.refresh() == 11
+    assert rows[10]["message"]["content"][0]["text"] == "10"
+
+
+def test_indexed_transcript_drops_blocks_of_a_replaced_file(tmp_path: Path, index: SessionIndex) -> None:
+    path = write_log(tmp_path / "s.jsonl", 8, text="old")
+    rows = IndexedTranscript(index, path)
+    generation = index.summary(path).generation  # type: ignore[union-attr]
+    assert {rows[i]["message"]["content"][0]["text"] for i in range(8)} == {"old"}
+    # A larger replacement must not be mistaken for an append to the cached blocks.
+    os.replace(write_log(tmp_path / "new.jsonl", 10, text="new"), path)
+    assert rows.refresh() == 10
+    assert index.summary(path).generation != generation  # type: ignore[union-attr]
+    assert {rows[i]["message"]["content"][0]["text"] for i in range(10)} == {"new"}
@@ -0,0 +1,121 @@
+"""LRU eviction, cold storage and live updates of :class:`SessionStore`."""
+
+from __future__ import annotations
+
+import gc
+import os
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+from src.services.index import SessionIndex
+from src.services.store import ColdStorage, SessionStore, available_cold_storage
+from tests.factories import record_line, write_log
+
+RECORDS = 300
+
+
+@pytest.fixture
+def logs(tmp_path: Path) -> list[Path]:
+    return [write_log(tmp_path / f"s{i}.jsonl", RECORDS, session_id=f"s{i}") for i in range(5)]
+
+
+def _store(logs: list[Path], sessions_in_budget: float, cold: ColdStorage = "disk") -> SessionStore:
+    probe = SessionStore(SessionIndex())
+    probe.records(logs[0])
+    store = SessionStore(SessionIndex(), budget=int(probe.resident_bytes * sessions_in_budget), cold=cold)
+    for path in logs:
+        store.update(path)
+    return store
+
+
+def _raw(store: SessionStore, path: Path) -> list[bytes]:
+    return [record.raw for record in store.records(path)]
+
+
+def test_summaries_do_not_materialize_records(logs: list[Path]) -> None:
+    store = _store(logs, 2.5)
+    assert [s.session_id for s in store.sessions()] == ["s0", "s1", "s2", "s3", "s4"]
+    assert store.summary(logs[3]).record_count == RECORDS  # type: ignore[union-attr]
+    assert store.resident_bytes == 0 and store.hot == []
+
+
+def test_least_recently_used_sessions_are_evicted_to_disk(logs: list[Path]) -> None:
+    store = _store(logs, 2.5)
+    expected = {path: path.read_bytes().splitlines() for path in logs}
+    for path in logs[:3]:
+        assert _raw(store, path) == expected[path]
+    assert store.hot == logs[1:3] and store.resident_bytes <= store.budget
+    store.records(logs[1])
+    store.records(logs[4])
+    assert store.hot == [logs[1], logs[4]]
+    # Evicted sessions are re-read through the index, identically.
+    assert _raw(store, logs[0]) == expected[logs[0]]
+    assert store.hot == [logs[4], logs[0]]
+    assert store.stats.loads == 5 and store.stats.evictions == 3
+
+
+@pytest.mark.parametrize("codec", [c for c in available_cold_storage() if c != "disk"])
+def test_cold_sessions_are_kept_compressed(logs: list[Path], codec: ColdStorage) -> None:
+    store = _store(logs, 2.5, cold=codec)
+    originals = [_raw(store, path) for path in logs[:3]]
+    assert store.hot == logs[1:3] and store.resident_bytes <= store.budget
+    assert _raw(store, logs[0]) == originals[0]
+    assert store.stats.thaws == 1 and store.stats.loads == 3
+    # Hot sessions claim the room back from compressed copies, oldest first.
+    store.budget = store.resident_bytes // 2 + 1
+    store.records(logs[3])
+    assert store.hot == [logs[3]] and store.stats.drops > 0 and store.resident_bytes <= store.budget
+
+
+def test_update_extends_hot_and_compressed_copies(logs: list[Path]) -> None:
+    store = _store(logs, 10, cold="zlib")
+    store.records(logs[0])
+    store.records(logs[1])
+    store.evict(logs[1])
+    for path in logs[:2]:
+        with open(path, "ab") as fh:
+            fh.write(record_line(session_id="late", text="appended"))
+        assert store.update(path).record_count == RECORDS + 1  # type: ignore[union-attr]
+    assert store.records(logs[0])[-1].session_id == "late"
+    assert store.records(logs[1])[-1].session_id == "late"
+    assert store.stats.thaws == 1 and store.stats.loads == 2
+
+
+def test_rewritten_or_deleted_transcripts_are_dropped(logs: list[Path]) -> None:
+    store = _store(logs, 10)
+    store.records(logs[0])
+    write_log(logs[0], 10, session_id="rewritten")
+    assert store.update(logs[0]).record_count == 10  # type: ignore[union-attr]
+    assert store.hot == [] and store.resident_bytes == 0
+    assert {r.session_id for r in store.records(logs[0])} == {"rewritten"}
+    logs[0].unlink()
+    assert store.update(logs[0]) is None and logs[0] not in store
+    with pytest.raises(FileNotFoundError):
+        store.records(logs[0])
+
+
+@pytest.mark.parametrize("cold", available_cold_storage())
+def test_replaced_transcripts_are_dropped_even_when_they_grew(tmp_path: Path, cold: ColdStorage) -> None:
+    path = write_log(tmp_path / "s.jsonl", 3, session_id="old")
+    store = SessionStore(SessionIndex(), cold=cold)
+    store.records(path)
+    os.replace(write_log(tmp_path / "new.jsonl", 5, session_id="new"), path)
+    assert store.update(path).record_count == 5  # type: ignore[union-attr]
+    assert [r.session_id for r in store.records(path)] == ["new"] * 5
+
+
+def test_resident_estimate_tracks_real_allocations(logs: list[Path]) -> None:
+    store = _store(logs, 100)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for path in logs:
+            store.records(path)
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    assert 0.7 * used < store.resident_bytes < 1.3 * used
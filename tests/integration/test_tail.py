@@ -0,0 +1,139 @@
+"""JSONLTailer against real files: appends, partial lines, truncation and rotation."""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+from src.services.tail import FINGERPRINT_BYTES, FileCursor, JSONLTailer
+from tests.factories import record_line
+
+
+def _append(path: Path, data: bytes) -> None:
+    with open(path, "ab") as fh:
+        fh.write(data)
+
+
+def test_reads_only_appended_lines(tmp_path: Path) -> None:
+    path = tmp_path / "s.jsonl"
+    _append(path, record_line(text="a") + record_line(text="b"))
+    tailer = JSONLTailer()
+    batch = tailer.poll(path)
+    assert batch is not None and len(batch.records) == 2
+    assert (batch.start_offset, batch.end_offset) == (0, path.stat().st_size)
+
+    _append(path, record_line(text="c"))
+    batch = tailer.poll(path)
+    assert batch is not None and [r["message"]["content"][0]["text"] for r in batch.records] == ["c"]
+    assert not batch.reset
+
+    batch = tailer.poll(path)
+    assert batch is not None and not batch
+
+
+def test_partial_line_is_held_back_until_complete(tmp_path: Path) -> None:
+    path = tmp_path / "s.jsonl"
+    line = record_line()
+    _append(path, line[:20])
+    tailer = JSONLTailer(read_size=8)
+    batch = tailer.poll(path)
+    assert batch is not None and batch.records == []
+    cursor = tailer.cursor(path)
+    assert cursor is not None and (cursor.offset, cursor.size) == (0, 20)
+    assert FileCursor.from_dict(cursor.to_dict()) == cursor
+    _append(path, line[20:])
+    batch = tailer.poll(path)
+    assert batch is not None and len(batch.records) == 1
+
+
+def test_start_at_end_skips_existing_content(tmp_path: Path) -> None:
+    path = tmp_path / "s.jsonl"
+    _append(path, record_line() * 3 + record_line()[:10])
+    tailer = JSONLTailer(start_at_end=True)
+    batch = tailer.poll(path)
+    assert batch is not None and batch.records == []
+    # The partial line written before attaching is completed and reported.
+    _append(path, record_line()[10:])
+    batch = tailer.poll(path)
+    assert batch is not None and len(batch.records) == 1
+
+
+def test_truncation_rereads_from_start(tmp_path: Path) -> None:
+    path = tmp_path / "s.jsonl"
+    _append(path, record_line() * 3)
+    tailer = JSONLTailer()
+    tailer.poll(path)
+    with open(path, "r+b") as fh:
+        fh.truncate(len(record_line()))
+    batch = tailer.poll(path)
+    assert batch is not None and batch.reset and len(batch.records) == 1
+
+
+def test_replacement_is_detected(tmp_path: Path) -> None:
+    path = tmp_path / "s.jsonl"
+    _append(path, record_line(session_id="old"))
+    tailer = JSONLTailer()
+    tailer.poll(path)
+    replacement = tmp_path / "new.jsonl"
+    _append(replacement, record_line(session_id="new") * 2)
+    os.replace(replacement, path)
+    batch = tailer.poll(path)
+    assert batch is not None and batch.reset
+    assert [r["sessionId"] for r in batch.records] == ["new", "new"]
+
+
+def test_rewrite_in_place_is_detected_by_fingerprint(tmp_path: Path) -> None:
+    path = tmp_path / "s.jsonl"
+    _append(path, record_line(session_id="aaaa"))
+    tailer = JSONLTailer()
+    tailer.poll(path)
+    cursor = tailer.cursor(path)
+    assert cursor is not None and 0 < cursor.fingerprint_len <= FINGERPRINT_BYTES
+    # Same inode, larger size, different head: not an append.
+    with open(path, "r+b") as fh:
+        fh.write(record_line(session_id="bbbb") * 2)
+    batch = tailer.poll(path)
+    assert batch is not None and batch.reset
+    assert [r["sessionId"] for r in batch.records] == ["bbbb", "bbbb"]
+
+
+def test_deleted_file_drops_cursor(tmp_path: Path) -> None:
+    path = tmp_path / "s.jsonl"
+    _append(path, record_line())
+    tailer = JSONLTailer()
+    tailer.poll(path)
+    assert tailer.paths == [path]
+    path.unlink()
+    assert tailer.poll(path) is None
+    assert tailer.paths == []
+
+
+def test_malformed_lines_are_counted(tmp_path: Path) -> None:
+    path = tmp_path / "s.jsonl"
+    _append(path, b"{not json\n" + record_line() + b"\n")
+    batch = JSONLTailer().poll(path)
+    assert batch is not None and len(batch.records) == 1 and batch.malformed == 1
+
+
+def test_state_round_trip(tmp_path: Path) -> None:
+    path = tmp_path / "s.jsonl"
+    state = tmp_path / "state" / "tail.json"
+    _append(path, record_line() * 2)
+    tailer = JSONLTailer(state)
+    tailer.poll(path)
+    tailer.save()
+    assert json.loads(state.read_text())["version"] == 1
+
+    _append(path, record_line())
+    resumed = JSONLTailer(state)
+    assert resumed.cursor(path) == tailer.cursor(path)
+    batch = resumed.poll(path)
+    assert batch is not None and len(batch.records) == 1 and not batch.reset
+
+
+def test_corrupt_state_is_ignored(tmp_path: Path) -> None:
+    state = tmp_path / "tail.json"
+    state.write_text("[not a dict")
+    assert JSONLTailer(state).paths == []
+    JSONLTailer(None).save()
@@ -0,0 +1,286 @@
+"""Watcher backends against a simulated transcript write workload."""
+
+from __future__ import annotations
+
+import os
+import statistics
+import threading
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Literal
+
+import pytest
+
+from src.services.watcher import (
+    ChangeKind,
+    EventQueue,
+    InotifyBackend,
+    PollingBackend,
+    WatcherBackend,
+    WatchEvent,
+    create_watcher,
+)
+from tests.factories import record_line
+
+requires_inotify = pytest.mark.skipif(not InotifyBackend.available(), reason="inotify not available")
+
+BackendFactory = Callable[[EventQueue], WatcherBackend]
+
+BACKENDS: dict[str, BackendFactory] = {
+    "polling": lambda q: PollingBackend(q, min_interval=0.01, max_interval=0.5, hot_window=1.0),
+    "inotify": lambda q: InotifyBackend(q),
+}
+
+
+@pytest.fixture(params=[pytest.param("polling"), pytest.param("inotify", marks=requires_inotify)])
+def backend_factory(request: pytest.FixtureRequest) -> BackendFactory:
+    return BACKENDS[request.param]
+
+
+@pytest.fixture
+def queue() -> Iterator[EventQueue]:
+    q = EventQueue(debounce=0.005, max_latency=0.02)
+    yield q
+    q.close()
+
+
+def _wait_for(queue: EventQueue, predicate: Callable[[WatchEvent], bool], timeout: float = 3.0) -> WatchEvent:
+    deadline = time.monotonic() + timeout
+    while (remaining := deadline - time.monotonic()) > 0:
+        for event in queue.get(timeout=remaining):
+            if predicate(event):
+                return event
+    raise AssertionError("no matching event before timeout")
+
+
+def _append(path: Path, data: bytes) -> None:
+    with open(path, "ab") as fh:
+        fh.write(data)
+
+
+def _open_fds() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+
+# -- EventQueue -------------------------------------------------------------
+
+
+def test_queue_coalesces_events_per_path(tmp_path: Path) -> None:
+    q = EventQueue(debounce=0.01, max_latency=1.0)
+    a, b = tmp_path / "a.jsonl", tmp_path / "b.jsonl"
+    q.put(a, ChangeKind.CREATED)
+    q.put(a, ChangeKind.MODIFIED)
+    q.put(b, ChangeKind.MODIFIED)
+    q.put(b, ChangeKind.DELETED)
+    assert len(q) == 2
+    assert q.get(timeout=1.0) == [WatchEvent(a, ChangeKind.CREATED), WatchEvent(b, ChangeKind.DELETED)]
+    assert q.get(timeout=0.01) == []
+
+
+def test_queue_max_latency_bounds_continuous_writes(tmp_path: Path) -> None:
+    q = EventQueue(debounce=0.05, max_latency=0.1)
+    path = tmp_path / "a.jsonl"
+    start = time.monotonic()
+    stop = threading.Event()
+
+    def writer() -> None:
+        while not stop.is_set():
+            q.put(path, ChangeKind.MODIFIED)
+            time.sleep(0.005)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        assert q.get(timeout=2.0) == [WatchEvent(path, ChangeKind.MODIFIED)]
+        assert time.monotonic() - start < 0.5
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_queue_close_releases_consumer() -> None:
+    q = EventQueue()
+    threading.Timer(0.05, q.close).start()
+    assert q.get() == []
+
+
+# -- backends ---------------------------------------------------------------
+
+
+def test_reports_created_modified_and_deleted(
+    backend_factory: BackendFactory, queue: EventQueue, tmp_path: Path
+) -> None:
+    project = tmp_path / "project"
+    project.mkdir()
+    with backend_factory(queue) as watcher:
+        watcher.watch(tmp_path)
+        time.sleep(0.05)
+        path = project / "s.jsonl"
+        _append(path, record_line())
+        _wait_for(queue, lambda e: e.path == path and e.kind is ChangeKind.CREATED)
+
+        _append(path, record_line())
+        _wait_for(queue, lambda e: e.path == path and e.kind is ChangeKind.MODIFIED)
+
+        # Other suffixes are ignored.
+        _append(project / "notes.txt", b"x")
+        path.unlink()
+        event = _wait_for(queue, lambda e: e.path == path)
+        assert event.kind is ChangeKind.DELETED
+        assert all(e.path.suffix == ".jsonl" for e in queue.get(timeout=0.1))
+
+
+def test_new_subdirectory_is_watched(backend_factory: BackendFactory, queue: EventQueue, tmp_path: Path) -> None:
+    with backend_factory(queue) as watcher:
+        watcher.watch(tmp_path)
+        time.sleep(0.05)
+        nested = tmp_path / "new-project" / "deeper"
+        nested.mkdir(parents=True)
+        time.sleep(0.05)
+        path = nested / "s.jsonl"
+        _append(path, record_line())
+        _wait_for(queue, lambda e: e.path == path and e.kind is ChangeKind.CREATED)
+        _append(path, record_line())
+        _wait_for(queue, lambda e: e.path == path and e.kind is ChangeKind.MODIFIED)
+
+
+# Default configuration: what create_watcher() builds, fed into an EventQueue() with its defaults.
+DEFAULT_BACKENDS = [pytest.param("inotify", marks=requires_inotify), pytest.param("polling")]
+
+
+@pytest.mark.parametrize("backend", DEFAULT_BACKENDS)
+def test_streaming_writes_are_seen_promptly(backend: Literal["inotify", "polling"], tmp_path: Path) -> None:
+    path = tmp_path / "s.jsonl"
+    _append(path, record_line())
+    latencies = []
+    queue = EventQueue()
+    with create_watcher(queue, backend=backend) as watcher:
+        watcher.watch(tmp_path)
+        time.sleep(0.05)
+        for n in range(40):
+            written = time.monotonic()
+            _append(path, record_line())
+            _wait_for(queue, lambda e: e.path == path)
+            latencies.append(time.monotonic() - written)
+            # Uneven pauses, so polling is not always caught at the same point of its cycle.
+            time.sleep(0.02 + 0.01 * (n % 7))
+    queue.close()
+    p95 = statistics.quantiles(latencies, n=20)[18]
+    assert p95 < 0.05
+
+
+@pytest.mark.parametrize("backend", DEFAULT_BACKENDS)
+def test_idle_watcher_uses_little_cpu(backend: Literal["inotify", "polling"], tmp_path: Path) -> None:
+    for n in range(200):
+        (tmp_path / f"project-{n}").mkdir()
+        _append(tmp_path / f"project-{n}" / "s.jsonl", record_line())
+    queue = EventQueue()
+    with create_watcher(queue, backend=backend) as watcher:
+        watcher.watch(tmp_path)
+        # Let polling back off from the fast interval new entries start at.
+        time.sleep(1.0)
+        started = time.process_time()
+        time.sleep(1.0)
+        used = time.process_time() - started
+    queue.close()
+    assert len(queue) == 0
+    # Nothing is written: under 2% of one core across every thread of the process.
+    assert used < 0.02
+
+
+# -- polling ----------------------------------------------------------------
+
+
+def test_polling_stays_hot_between_bursts(queue: EventQueue, tmp_path: Path) -> None:
+    path = tmp_path / "s.jsonl"
+    _append(path, record_line())
+    watcher = PollingBackend(queue, min_interval=0.01, max_interval=2.0, hot_window=5.0)
+    with watcher:
+        watcher.watch(tmp_path)
+        time.sleep(0.05)
+        _append(path, record_line())
+        _wait_for(queue, lambda e: e.path == path)
+        # Idle long enough that plain exponential backoff would reach max_interval.
+        time.sleep(1.0)
+        written = time.monotonic()
+        _append(path, record_line())
+        _wait_for(queue, lambda e: e.path == path)
+        assert time.monotonic() - written < 0.2
+
+
+def test_polling_backs_off_after_hot_window(queue: EventQueue, tmp_path: Path) -> None:
+    path = tmp_path / "s.jsonl"
+    _append(path, record_line())
+    watcher = PollingBackend(queue, min_interval=0.01, max_interval=0.16, hot_window=0.1)
+    with watcher:
+        watcher.watch(tmp_path)
+        _append(path, record_line())
+        _wait_for(queue, lambda e: e.path == path)
+        time.sleep(0.8)
+        with watcher._lock:
+            assert watcher._entries[path].interval == pytest.approx(0.16)
+
+
+def test_polling_untouched_files_back_off_immediately(queue: EventQueue, tmp_path: Path) -> None:
+    path = tmp_path / "s.jsonl"
+    _append(path, record_line())
+    watcher = PollingBackend(queue, min_interval=0.01, max_interval=0.08, hot_window=60.0)
+    with watcher:
+        watcher.watch(tmp_path)
+        time.sleep(0.4)
+        with watcher._lock:
+            assert watcher._entries[path].interval == pytest.approx(0.08)
+
+
+# -- inotify ----------------------------------------------------------------
+
+
+@requires_inotify
+def test_inotify_stop_without_start_releases_descriptors(queue: EventQueue) -> None:
+    before = _open_fds()
+    watcher = InotifyBackend(queue)
+    assert _open_fds() == before + 3
+    watcher.stop()
+    assert _open_fds() == before
+
+
+@requires_inotify
+def test_inotify_can_restart_after_stop(queue: EventQueue, tmp_path: Path) -> None:
+    before = _open_fds()
+    watcher = InotifyBackend(queue)
+    watcher.watch(tmp_path)
+    watcher.start()
+    watcher.stop()
+    assert _open_fds() == before
+
+    with watcher:
+        path = tmp_path / "s.jsonl"
+        _append(path, record_line())
+        _wait_for(queue, lambda e: e.path == path and e.kind is ChangeKind.CREATED)
+    assert _open_fds() == before
+
+
+@requires_inotify
+def test_inotify_restart_keeps_roots_watched_before_stop(queue: EventQueue, tmp_path: Path) -> None:
+    first, second = tmp_path / "a", tmp_path / "b"
+    first.mkdir()
+    second.mkdir()
+    watcher = InotifyBackend(queue)
+    watcher.watch(first)
+    watcher.start()
+    watcher.stop()
+    watcher.watch(second)
+    with watcher:
+        for root in (first, second):
+            path = root / "s.jsonl"
+            _append(path, record_line())
+            _wait_for(queue, lambda e, path=path: e.path == path and e.kind is ChangeKind.CREATED)
+
+
+def test_create_watcher_backends(queue: EventQueue) -> None:
+    polling = create_watcher(queue, backend="polling")
+    assert isinstance(polling, PollingBackend)
+    auto = create_watcher(queue)
+    assert auto.name == ("inotify" if InotifyBackend.available() else "polling")
+    auto.stop()
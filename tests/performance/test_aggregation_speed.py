@@ -0,0 +1,57 @@
+"""Window queries must not get slower as history grows.
+
+Panels re-query on every refresh, so a "last 5 hours" or "last 30 days"
+window has to cost the same after a month of records as after a few days.
+Records arrive at a steady rate, so a longer history means more records.
+"""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from src.core.aggregation import RollingAggregator
+from src.core.records import LogRecord
+
+NOW = 1_760_000_000
+MONTH = 30 * 24 * 3600
+STEP_S = 13
+QUERY_BUDGET_S = 0.010
+
+
+def _aggregator(count: int) -> RollingAggregator:
+    agg = RollingAggregator()
+    for i in range(count):
+        record = LogRecord(
+            b"{}", session_id=f"s{i % 50}", model=("opus", "sonnet")[i % 2], input_tokens=i % 97, cost_nanos=1_000
+        )
+        agg.add(record, project=f"p{i % 5}", when=NOW - (count - i) * STEP_S)
+    return agg
+
+
+def _slowest_query(agg: RollingAggregator) -> float:
+    worst = 0.0
+    for seconds in (60, 5 * 3600, 24 * 3600, MONTH):
+        for key in ({}, {"model": "opus"}, {"session": "s7"}):
+            start = time.perf_counter()
+            agg.last(seconds, now=NOW, **key)
+            worst = max(worst, time.perf_counter() - start)
+    return worst
+
+
+@pytest.mark.parametrize("count", [20_000, 200_000])
+def test_window_query_within_budget(benchmark: BenchmarkFixture, count: int) -> None:
+    agg = _aggregator(count)
+    totals = benchmark(agg.last, 5 * 3600, now=NOW)
+    assert totals.records > 0
+    assert _slowest_query(agg) < QUERY_BUDGET_S
+
+
+def test_query_cost_is_flat_across_history_sizes(benchmark: BenchmarkFixture) -> None:
+    small, large = _aggregator(20_000), _aggregator(200_000)
+    small_s = min(_slowest_query(small) for _ in range(3))
+    large_s: list[float] = []
+    benchmark.pedantic(lambda: large_s.append(_slowest_query(large)), rounds=3, iterations=1)
+    assert min(large_s) < max(2 * small_s, 0.002)
@@ -0,0 +1,56 @@
+"""Backfill throughput (records/sec) against worker count.
+
+The history mixes many small transcripts with one large one, so the scaling
+also covers splitting a single file into byte ranges.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from pathlib import Path
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from src.services.backfill import backfill
+from src.services.index import SessionIndex
+from tests.factories import write_log
+
+CHUNK_SIZE = 1024 * 1024
+WORKERS = sorted({1, 2, 4, min(8, os.cpu_count() or 1)})
+
+
+@pytest.fixture(scope="module")
+def history(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    root = tmp_path_factory.mktemp("projects")
+    write_log(root / "huge" / "session.jsonl", 100_000)
+    for i in range(100):
+        write_log(root / "small" / f"session-{i}.jsonl", 500)
+    return root
+
+
+def _rows(db: Path) -> list[tuple]:
+    # Generations count how often a file was indexed from scratch, and every benchmark round does that again.
+    with sqlite3.connect(db) as conn:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(files)") if row[1] != "generation"]
+        return conn.execute(f"SELECT {', '.join(columns)} FROM files ORDER BY path").fetchall()
+
+
+@pytest.mark.parametrize("jobs", WORKERS, ids=[f"jobs={j}" for j in WORKERS])
+def test_backfill_records_per_second(benchmark: BenchmarkFixture, tmp_path: Path, history: Path, jobs: int) -> None:
+    db = tmp_path / "index.db"
+
+    def run() -> int:
+        with SessionIndex(db) as index:
+            return sum(s.record_count for s in backfill(index, [history], jobs=jobs, chunk_size=CHUNK_SIZE, force=True))
+
+    records = benchmark.pedantic(run, rounds=2, iterations=1)
+    assert records == 150_000
+    assert benchmark.stats is not None
+    benchmark.extra_info["jobs"] = jobs
+    benchmark.extra_info["records_per_second"] = round(records / benchmark.stats["mean"])
+
+    with SessionIndex(tmp_path / "sequential.db") as index:
+        index.refresh_all([history])
+    assert _rows(db) == _rows(tmp_path / "sequential.db")
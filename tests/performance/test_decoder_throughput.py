@@ -0,0 +1,73 @@
+"""Decode throughput of the fast path against stdlib ``json``.
+
+Lines carry realistic bodies (long text and tool payloads) that the hot
+fields never need, and a share of them are line types the dashboards skip.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Callable
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from src.core.records import RecordDecoder, available_backends
+from tests.factories import record_dict
+
+FAST_BACKENDS = [b for b in available_backends() if b != "json"]
+
+
+def _lines(count: int = 5_000) -> list[bytes]:
+    lines = []
+    for i in range(count):
+        if i % 5 == 0:
+            obj = {"type": "summary", "summary": "x" * 200, "leafUuid": str(i)}
+        else:
+            obj = record_dict(type="assistant" if i % 2 else "user", text="lorem ipsum " * 150)
+            obj["message"]["content"].append({"type": "tool_use", "name": "Read", "input": {"file_path": "/a" * 50}})
+        lines.append(json.dumps(obj).encode())
+    return lines
+
+
+LINES = _lines()
+
+
+def _stdlib_full_decode() -> int:
+    return sum(1 for line in LINES if json.loads(line)["type"] in ("assistant", "user"))
+
+
+def _decode(decoder: RecordDecoder) -> int:
+    return sum(1 for _ in decoder.decode_lines(LINES))
+
+
+def _best_of(fn: Callable[[], object], rounds: int = 5) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("types", [None, ("assistant", "user")], ids=["no-filter", "prefilter"])
+def test_decode_throughput(benchmark: BenchmarkFixture, backend: str, types: tuple[str, ...] | None) -> None:
+    decoder = RecordDecoder(types, backend=backend)
+    expected = len(LINES) if types is None else _stdlib_full_decode()
+    assert benchmark(_decode, decoder) == expected
+    assert benchmark.stats is not None
+    benchmark.extra_info["lines_per_second"] = round(len(LINES) / benchmark.stats["mean"])
+
+
+def test_stdlib_baseline(benchmark: BenchmarkFixture) -> None:
+    assert benchmark(_stdlib_full_decode) == 4_000
+
+
+@pytest.mark.skipif(not FAST_BACKENDS, reason="neither msgspec nor orjson is installed")
+def test_fast_path_beats_full_stdlib_decode(benchmark: BenchmarkFixture) -> None:
+    decoder = RecordDecoder(backend=FAST_BACKENDS[0])
+    benchmark.pedantic(_decode, args=(decoder,), rounds=5, iterations=1)
+    assert benchmark.stats is not None
+    assert benchmark.stats["min"] < 0.75 * _best_of(_stdlib_full_decode)
@@ -0,0 +1,70 @@
+"""Cold startup and random access through the session index.
+
+Opening the session list must stay within the 500 ms startup budget with
+months of history on disk, and seeking into a transcript must not depend on
+how far into the file the target record is.
+"""
+
+from __future__ import annotations
+
+import statistics
+import time
+from pathlib import Path
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from src.services.index import SessionIndex
+from tests.factories import write_log
+
+STARTUP_BUDGET_S = 0.500
+SEEK_BUDGET_S = 0.005
+
+
+@pytest.fixture(scope="module")
+def history(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    root = tmp_path_factory.mktemp("projects")
+    for project in range(20):
+        for session in range(50):
+            write_log(root / f"project-{project}" / f"session-{session}.jsonl", 200)
+    return root
+
+
+@pytest.fixture(scope="module")
+def transcript(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    return write_log(tmp_path_factory.mktemp("big") / "huge.jsonl", 200_000)
+
+
+def test_warm_startup_lists_sessions_within_budget(benchmark: BenchmarkFixture, tmp_path: Path, history: Path) -> None:
+    db = tmp_path / "index.db"
+    with SessionIndex(db) as index:
+        index.refresh_all([history])
+
+    def startup() -> int:
+        with SessionIndex(db) as index:
+            return len(index.refresh_all([history]))
+
+    assert benchmark.pedantic(startup, rounds=3, iterations=1) == 1000
+    assert benchmark.stats is not None and benchmark.stats["max"] < STARTUP_BUDGET_S
+
+
+def _median_seek(index: SessionIndex, path: Path, record: int, rounds: int = 50) -> float:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        assert len(index.read_records(path, record, 1)) == 1
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def test_seek_cost_is_independent_of_position(benchmark: BenchmarkFixture, tmp_path: Path, transcript: Path) -> None:
+    with SessionIndex(tmp_path / "index.db") as index:
+        summary = index.refresh(transcript)
+        assert summary is not None and summary.record_count == 200_000
+
+        middle = benchmark(index.read_records, transcript, 100_000, 1)
+        assert middle[0]["timestamp"] == "2026-01-01T03:46:40Z"
+
+        near, far = _median_seek(index, transcript, 10), _median_seek(index, transcript, 199_990)
+        assert far < SEEK_BUDGET_S
+        assert far < max(3 * near, 0.001)
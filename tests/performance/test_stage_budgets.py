@@ -0,0 +1,133 @@
+"""Stage-level budgets read from the instrumentation's JSON export.
+
+End-to-end timings say that something got slower; these say which stage.
+Each test runs one part of the pipeline with :data:`metrics` enabled and
+checks the exported p99 batch latency or throughput of its stage. The runs
+go through the ``benchmark`` fixture, so they are part of ``--benchmark-only``
+runs. Every round starts from fresh metrics, and a budget holds when the
+best round meets it, so one noisy round does not fail the suite.
+"""
+
+from __future__ import annotations
+
+import gc
+import json
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from src.core.aggregation import RollingAggregator
+from src.core.records import RecordDecoder
+from src.services.index import SCAN_BATCH, scan_range
+from src.tui.refresh import ListWidget, RefreshScheduler
+from src.tui.virtual_list import VirtualList
+from src.utils.instrumentation import metrics
+from tests.factories import write_log
+
+RECORDS = 20_000
+FRAME_BUDGET_MS = 1000 / 60
+PARSE_P99_MS = 25.0
+AGGREGATE_P99_MS = 10.0
+MIN_INGEST_RECORDS_PER_S = 20_000
+DISABLED_OVERHEAD = 0.01
+ROUNDS = 3
+
+
+@pytest.fixture
+def profiled() -> Iterator[None]:
+    # Budgets cover the stages' own work; a full collection over whatever
+    # earlier tests left on the heap would otherwise dominate the p99.
+    gc.collect()
+    gc.disable()
+    metrics.enable()
+    try:
+        yield
+    finally:
+        metrics.disable()
+        metrics.reset()
+        gc.enable()
+
+
+def _stages() -> dict[str, Any]:
+    return json.loads(metrics.to_json())["stages"]
+
+
+def _rounds(benchmark: BenchmarkFixture, run: Callable[[], object]) -> list[dict[str, Any]]:
+    """Exported stages of each benchmarked round of ``run``."""
+    rounds: list[dict[str, Any]] = []
+
+    def measured() -> None:
+        run()
+        rounds.append(_stages())
+
+    benchmark.pedantic(measured, setup=metrics.reset, rounds=ROUNDS, iterations=1)
+    return rounds
+
+
+def _best(rounds: list[dict[str, Any]], stage: str) -> float:
+    return min(stages[stage]["p99_ms"] for stages in rounds)
+
+
+@pytest.fixture(scope="module")
+def transcript(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    return write_log(tmp_path_factory.mktemp("budgets") / "session.jsonl", RECORDS)
+
+
+def test_scan_stage_budgets(benchmark: BenchmarkFixture, transcript: Path, profiled: None) -> None:
+    rounds = _rounds(benchmark, lambda: scan_range(transcript))
+    for stages in rounds:
+        assert stages["parse"]["items"] == stages["aggregate"]["items"] == stages["ingest"]["items"] == RECORDS
+        assert stages["parse"]["count"] == -(-RECORDS // SCAN_BATCH)
+    assert _best(rounds, "parse") < PARSE_P99_MS
+    assert _best(rounds, "aggregate") < AGGREGATE_P99_MS
+    assert max(RECORDS / stages["ingest"]["busy_s"] for stages in rounds) > MIN_INGEST_RECORDS_PER_S
+
+
+def test_rolling_aggregate_budget(benchmark: BenchmarkFixture, transcript: Path, profiled: None) -> None:
+    records = list(RecordDecoder().decode_lines(transcript.read_bytes().splitlines()))
+
+    def aggregate_all() -> None:
+        aggregator = RollingAggregator()
+        for start in range(0, len(records), SCAN_BATCH):
+            aggregator.add_many(records[start : start + SCAN_BATCH])
+
+    rounds = _rounds(benchmark, aggregate_all)
+    assert all(stages["aggregate"]["items"] == RECORDS for stages in rounds)
+    assert _best(rounds, "aggregate") < AGGREGATE_P99_MS
+
+
+def test_render_stage_fits_a_frame(benchmark: BenchmarkFixture, profiled: None) -> None:
+    rows = [f"[{i}] " + "lorem ipsum dolor sit amet " * (1 + i % 7) for i in range(100_000)]
+    widget = ListWidget(VirtualList(rows, width=100, height=50))
+    scheduler = RefreshScheduler(lambda changes: None)
+    scheduler.mount(widget, top=0, height=50)
+
+    def scroll() -> None:
+        for i in range(300):
+            widget.view.scroll_by(7 if i % 3 else -2)
+            scheduler.mark_dirty(widget)
+            scheduler.frame()
+
+    rounds = _rounds(benchmark, scroll)
+    assert all(stages["render"]["count"] == 300 for stages in rounds)
+    assert _best(rounds, "render") < FRAME_BUDGET_MS
+
+
+def test_disabled_instrumentation_is_nearly_free(benchmark: BenchmarkFixture, transcript: Path) -> None:
+    assert not metrics.enabled
+    calls = 100_000
+    start = time.perf_counter()
+    for _ in range(calls):
+        with metrics.stage("parse", SCAN_BATCH):
+            pass
+    per_call = (time.perf_counter() - start) / calls
+    benchmark.pedantic(scan_range, args=(transcript,), rounds=ROUNDS, iterations=1)
+    assert benchmark.stats is not None
+    # A scan enters two stages per batch; together they must stay in the noise.
+    stage_calls = 2 * -(-RECORDS // SCAN_BATCH) + 1
+    assert per_call * stage_calls < DISABLED_OVERHEAD * benchmark.stats["min"]
+    assert _stages() == {}
@@ -0,0 +1,93 @@
+"""Peak RSS of a week of synthetic monitor activity with the session store.
+
+Each replay runs in a fresh process so that its peak RSS is not inflated by
+anything the test session did before. Every simulated hour, the active
+sessions get new records appended to their transcripts and are updated in
+the store, and the user opens the newest session plus a random older one.
+A baseline replay performs the same reads without a store; the difference
+between the two is what the store itself keeps resident. The bounded and
+unbounded replays run once each through the ``benchmark`` fixture, so they
+are part of ``--benchmark-only`` runs.
+"""
+
+from __future__ import annotations
+
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from src.services.index import SessionIndex
+from src.services.store import DEFAULT_BUDGET, SessionStore
+from src.utils.instrumentation import peak_rss_bytes
+from tests.factories import record_line
+
+MB = 1024 * 1024
+MEMORY_BUDGET_BYTES = 10 * MB
+
+HOURS = 7 * 24
+ACTIVE_HOURS = 3
+RECORDS_PER_HOUR = 100
+TEXT = "lorem ipsum dolor sit amet " * 20
+
+
+def _replay(root: str, store_budget: int | None) -> tuple[int, int]:
+    """Replay the week under ``root``; returns the process's peak RSS and records written."""
+    index = SessionIndex()
+    store = None if store_budget is None else SessionStore(index, budget=store_budget)
+    rng = random.Random(7)
+    written = 0
+    for hour in range(HOURS):
+        for started in range(max(0, hour - ACTIVE_HOURS + 1), hour + 1):
+            path = Path(root) / f"session-{started:03d}.jsonl"
+            with open(path, "ab") as fh:
+                for i in range(RECORDS_PER_HOUR):
+                    second = hour * 3600 + i * 30
+                    stamp = f"2026-01-{1 + second // 86400:02d}T{second // 3600 % 24:02d}:{second // 60 % 60:02d}:00Z"
+                    fh.write(record_line(session_id=path.stem, timestamp=stamp, text=TEXT))
+            written += RECORDS_PER_HOUR
+            if store is None:
+                index.refresh(path)
+            else:
+                store.update(path)
+        for viewed in (hour, rng.randrange(hour + 1)):
+            path = Path(root) / f"session-{viewed:03d}.jsonl"
+            if store is None:
+                summary = index.summary(path)
+                assert summary is not None
+                index.read_log_records(path, 0, summary.record_count)
+            else:
+                store.records(path)
+                assert store.resident_bytes <= store.budget or store.hot == [path]
+    return peak_rss_bytes(), written
+
+
+def _peak_rss(root: Path, store_budget: int | None) -> int:
+    root.mkdir()
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        peak, written = pool.submit(_replay, str(root), store_budget).result()
+    assert written == HOURS * ACTIVE_HOURS * RECORDS_PER_HOUR - RECORDS_PER_HOUR * 3
+    return peak
+
+
+@pytest.fixture(scope="module")
+def baseline_rss(tmp_path_factory: pytest.TempPathFactory) -> int:
+    return _peak_rss(tmp_path_factory.mktemp("replay") / "baseline", None)
+
+
+def test_week_long_replay_stays_within_memory_budget(
+    benchmark: BenchmarkFixture, tmp_path: Path, baseline_rss: int
+) -> None:
+    peak = benchmark.pedantic(_peak_rss, args=(tmp_path / "bounded", DEFAULT_BUDGET), rounds=1, iterations=1)
+    assert peak - baseline_rss < MEMORY_BUDGET_BYTES
+
+
+def test_unbounded_store_would_exceed_the_budget(
+    benchmark: BenchmarkFixture, tmp_path: Path, baseline_rss: int
+) -> None:
+    # Guards the test itself: without eviction the same replay must blow the budget.
+    peak = benchmark.pedantic(_peak_rss, args=(tmp_path / "unbounded", 1 << 62), rounds=1, iterations=1)
+    assert peak - baseline_rss > MEMORY_BUDGET_BYTES
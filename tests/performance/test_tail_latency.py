@@ -0,0 +1,77 @@
+"""Append-to-visible latency of :class:`JSONLTailer` must not grow with file size.
+
+The transcripts are sparse files so the 1 GB case costs no disk space; only
+the bytes appended after the tailer attached are ever read.
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+import time
+from pathlib import Path
+from typing import BinaryIO
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from src.services.tail import JSONLTailer
+from tests.factories import record_line
+
+MB = 1024 * 1024
+# Generous absolute budget for one append + poll; the flatness check below is the real test.
+LATENCY_BUDGET_S = 0.005
+
+
+def _sparse_log(path: Path, size: int) -> Path:
+    with open(path, "wb") as fh:
+        fh.write(record_line())
+        fh.seek(size - 1)
+        fh.write(b"\n")
+    return path
+
+
+def _append_and_poll(tailer: JSONLTailer, fh: BinaryIO, path: Path, line: bytes) -> int:
+    fh.write(line)
+    fh.flush()
+    batch = tailer.poll(path)
+    assert batch is not None
+    return len(batch.records)
+
+
+def _median_latency(path: Path, rounds: int = 50) -> float:
+    tailer = JSONLTailer(start_at_end=True)
+    tailer.poll(path)
+    line = record_line()
+    samples = []
+    with open(path, "ab") as fh:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            assert _append_and_poll(tailer, fh, path, line) == 1
+            samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+@pytest.mark.parametrize("size", [1 * MB, 64 * MB, 1024 * MB], ids=["1MB", "64MB", "1GB"])
+def test_append_to_visible_latency(benchmark: BenchmarkFixture, tmp_path: Path, size: int) -> None:
+    path = _sparse_log(tmp_path / "session.jsonl", size)
+    assert os.path.getsize(path) == size
+    tailer = JSONLTailer(start_at_end=True)
+    first = tailer.poll(path)
+    assert first is not None and first.records == []
+    line = record_line()
+    with open(path, "ab") as fh:
+        assert benchmark(_append_and_poll, tailer, fh, path, line) == 1
+    assert _median_latency(path) < LATENCY_BUDGET_S
+
+
+def test_latency_is_flat_across_file_sizes(benchmark: BenchmarkFixture, tmp_path: Path) -> None:
+    small = _sparse_log(tmp_path / "small.jsonl", 1 * MB)
+    large = _sparse_log(tmp_path / "large.jsonl", 1024 * MB)
+
+    def compare() -> tuple[float, float]:
+        return _median_latency(small), _median_latency(large)
+
+    small_s, large_s = benchmark.pedantic(compare, rounds=1, iterations=1)
+    # A full re-read of 1 GB would take hundreds of milliseconds; allow only noise.
+    assert large_s < max(3 * small_s, 0.001)
@@ -0,0 +1,232 @@
+"""Memory and navigation budgets for the windowed TUI views.
+
+Rows come from a lazy synthetic source, the way the views read from the
+session store, so the measurements cover only what the widget itself holds.
+Both budgets must hold - and stay flat - from a hundred rows to a million.
+
+The ingest-storm cases feed a burst of log lines through the
+:class:`IngestPump` while keys are pressed, and measure how long each key
+takes to reach the screen through the :class:`RefreshScheduler`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gc
+import statistics
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import dataclass, field
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from src.core.records import LogRecord, RecordDecoder
+from src.tui.ingest import IngestPump
+from src.tui.refresh import ListWidget, RefreshScheduler
+from src.tui.virtual_list import VirtualList
+from tests.factories import record_line
+
+MB = 1024 * 1024
+MEMORY_BUDGET_BYTES = 10 * MB
+NAVIGATION_BUDGET_S = 0.050
+STARTUP_BUDGET_S = 0.500
+
+STORM_LINES = 10_000
+STORM_BATCH = 500
+KEY_INTERVAL_S = 0.002
+MIN_KEYS = 100
+
+SIZES = [100, 10**4, 10**5, 10**6]
+SIZE_IDS = ["1e2", "1e4", "1e5", "1e6"]
+
+
+class SyntheticSession:
+    """Session of ``count`` messages whose text is generated on access."""
+
+    def __init__(self, count: int) -> None:
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> str:
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        # Mix of one-line and multi-line (wrapped) messages.
+        return f"[{index}] " + "lorem ipsum dolor sit amet " * (1 + index % 7)
+
+
+NAVIGATION: dict[str, Callable[[VirtualList[str]], None]] = {
+    "line_down": lambda v: v.scroll_by(1),
+    "line_up": lambda v: v.scroll_by(-1),
+    "page_down": lambda v: v.scroll_page(1),
+    "page_up": lambda v: v.scroll_page(-1),
+    "jump_middle": lambda v: v.scroll_to(v.row_count // 2),
+    "jump_end": lambda v: v.scroll_end(),
+    "jump_home": lambda v: v.scroll_home(),
+    "cursor_down": lambda v: v.move_cursor(1),
+    "cursor_far": lambda v: v.set_cursor(v.row_count * 3 // 4),
+    "resize": lambda v: v.resize(60 if v.width != 60 else 100, v.height),
+}
+
+
+def _open_view(count: int) -> VirtualList[str]:
+    view = VirtualList(SyntheticSession(count), width=100, height=50)
+    view.render()
+    return view
+
+
+def _peak_memory(count: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        view = _open_view(count)
+        for action in NAVIGATION.values():
+            action(view)
+            view.render()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _slowest_navigation(count: int) -> float:
+    view = _open_view(count)
+    worst = 0.0
+    for action in NAVIGATION.values():
+        start = time.perf_counter()
+        action(view)
+        view.render()
+        worst = max(worst, time.perf_counter() - start)
+    return worst
+
+
+class TimedScheduler(RefreshScheduler):
+    """Records, for every key handled, how long until a frame showed it."""
+
+    def __init__(self, max_fps: float) -> None:
+        super().__init__(lambda changes: None, max_fps=max_fps)
+        self.pressed: list[float] = []
+        self.latencies: list[float] = []
+
+    def frame(self) -> int:
+        written = super().frame()
+        now = time.perf_counter()
+        self.latencies.extend(now - t for t in self.pressed)
+        self.pressed.clear()
+        return written
+
+
+@dataclass
+class StormResult:
+    rows: int
+    frames: int
+    elapsed: float
+    handled: list[float] = field(default_factory=list)
+    drawn: list[float] = field(default_factory=list)
+
+
+def _storm_batches(count: int) -> Iterator[list[LogRecord]]:
+    # Runs on the pump's worker thread: producing the lines and decoding them stays off the loop.
+    decoder = RecordDecoder()
+    for start in range(0, count, STORM_BATCH):
+        lines = [record_line(text=f"message {i} " * (1 + i % 5)) for i in range(start, min(count, start + STORM_BATCH))]
+        yield list(decoder.decode_lines(lines))
+
+
+def _p99(samples: list[float]) -> float:
+    return statistics.quantiles(samples, n=100, method="inclusive")[98]
+
+
+async def _ingest_storm(lines: int, max_fps: float = 60.0) -> StormResult:
+    rows: list[str] = []
+    widget = ListWidget(VirtualList(rows, width=100, height=50, follow=True))
+    scheduler = TimedScheduler(max_fps)
+    scheduler.mount(widget, top=0, height=50)
+
+    def apply(records: Sequence[LogRecord]) -> None:
+        rows.extend(f"{r.timestamp} {r.model} {r.total_tokens}" for r in records)
+        scheduler.mark_dirty(widget)
+
+    pump: IngestPump[LogRecord] = IngestPump(apply)
+    keys: asyncio.Queue[tuple[str, float]] = asyncio.Queue()
+    handled: list[float] = []
+
+    async def handle_keys() -> None:
+        while True:
+            name, pressed = await keys.get()
+            handled.append(time.perf_counter() - pressed)
+            NAVIGATION[name](widget.view)
+            scheduler.mark_dirty(widget)
+            scheduler.pressed.append(pressed)
+
+    tasks = [asyncio.create_task(t) for t in (scheduler.run(), pump.run(), handle_keys())]
+    start = time.perf_counter()
+    producer = asyncio.create_task(pump.feed(_storm_batches(lines)))
+    names = [n for n in NAVIGATION if n != "resize"]
+    sent = 0
+    while not producer.done() or sent < MIN_KEYS:
+        keys.put_nowait((names[sent % len(names)], time.perf_counter()))
+        sent += 1
+        await asyncio.sleep(KEY_INTERVAL_S)
+    await producer
+    await pump.close()
+    await tasks[1]
+    await asyncio.sleep(2 * scheduler.interval)
+    elapsed = time.perf_counter() - start
+    scheduler.stop()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return StormResult(len(rows), scheduler.stats.frames, elapsed, handled, scheduler.latencies)
+
+
+class TestPerformanceBaseline:
+    @pytest.mark.parametrize("count", SIZES, ids=SIZE_IDS)
+    def test_startup_time(self, count: int) -> None:
+        start = time.perf_counter()
+        _open_view(count)
+        assert time.perf_counter() - start < STARTUP_BUDGET_S
+
+    @pytest.mark.parametrize("count", SIZES, ids=SIZE_IDS)
+    def test_memory_usage(self, count: int) -> None:
+        assert _peak_memory(count) < MEMORY_BUDGET_BYTES
+
+    @pytest.mark.parametrize("count", SIZES, ids=SIZE_IDS)
+    def test_navigation_response(self, count: int) -> None:
+        assert _slowest_navigation(count) < NAVIGATION_BUDGET_S
+
+    def test_memory_is_flat_across_session_sizes(self) -> None:
+        small, large = _peak_memory(100), _peak_memory(10**6)
+        # Only the viewport and bounded caches are held; allow noise, not growth.
+        assert large < 2 * small + 256 * 1024
+
+    def test_navigation_is_flat_across_session_sizes(self) -> None:
+        small = min(_slowest_navigation(100) for _ in range(3))
+        large = min(_slowest_navigation(10**6) for _ in range(3))
+        assert large < max(3 * small, 0.005)
+
+    def test_benchmark_widget_operations(self, benchmark: BenchmarkFixture) -> None:
+        view = _open_view(10**6)
+
+        def navigate() -> int:
+            for action in NAVIGATION.values():
+                action(view)
+            return len(view.render())
+
+        assert benchmark(navigate) == view.height
+
+    def test_keypress_latency_during_ingest_storm(self) -> None:
+        result = asyncio.run(_ingest_storm(STORM_LINES))
+        assert result.rows == STORM_LINES
+        assert len(result.handled) >= MIN_KEYS
+        # p99 from pressing a key until the frame showing its effect is drawn.
+        assert _p99(result.handled) < NAVIGATION_BUDGET_S
+        assert _p99(result.drawn) < NAVIGATION_BUDGET_S
+
+    def test_ingest_storm_frames_are_rate_limited(self) -> None:
+        max_fps = 30.0
+        result = asyncio.run(_ingest_storm(STORM_LINES, max_fps=max_fps))
+        # Thousands of appends and key presses, but never more frames than the cap allows.
+        assert result.frames <= result.elapsed * max_fps + 2
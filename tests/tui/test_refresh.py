@@ -0,0 +1,158 @@
+"""Frame coalescing, view-model skipping and line diffing of :class:`RefreshScheduler`,
+backpressure of :class:`IngestPump` and the hidden :class:`ProfilePanel`."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import Hashable, Sequence
+
+import pytest
+
+from src.tui.ingest import IngestPump
+from src.tui.profile_panel import ProfilePanel
+from src.tui.refresh import ListWidget, RefreshScheduler
+from src.tui.virtual_list import VirtualList
+from src.utils.instrumentation import Metrics
+
+
+class Label:
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.renders = 0
+
+    def view_model(self) -> Hashable:
+        return self.text
+
+    def render(self) -> list[str]:
+        self.renders += 1
+        return self.text.split("\n")
+
+
+class Screen:
+    def __init__(self) -> None:
+        self.writes: list[list[tuple[int, str]]] = []
+
+    def __call__(self, changes: list[tuple[int, str]]) -> None:
+        self.writes.append(changes)
+
+
+def test_frame_writes_only_changed_lines() -> None:
+    screen = Screen()
+    scheduler = RefreshScheduler(screen)
+    header, body = Label("title"), Label("a\nb\nc")
+    scheduler.mount(header, top=0, height=1)
+    scheduler.mount(body, top=1, height=4)
+    scheduler.frame()
+    assert screen.writes[-1] == [(0, "title"), (1, "a"), (2, "b"), (3, "c"), (4, "")]
+    body.text = "a\nB\nc"
+    scheduler.mark_dirty(body)
+    scheduler.frame()
+    assert screen.writes[-1] == [(2, "B")]
+    assert header.renders == 1
+
+
+def test_unchanged_view_model_skips_render() -> None:
+    screen = Screen()
+    scheduler = RefreshScheduler(screen)
+    label = Label("same")
+    scheduler.mount(label, top=0, height=1)
+    scheduler.frame()
+    scheduler.mark_dirty()
+    assert scheduler.frame() == 0
+    assert label.renders == 1 and scheduler.stats.skipped == 1 and len(screen.writes) == 1
+    scheduler.invalidate()
+    scheduler.frame()
+    assert screen.writes[-1] == [(0, "same")]
+
+
+def test_list_widget_ignores_rows_appended_out_of_view() -> None:
+    rows = [f"row {i}" for i in range(10)]
+    widget = ListWidget(VirtualList(rows, width=20, height=3))
+    scheduler = RefreshScheduler(Screen())
+    scheduler.mount(widget, top=0, height=3)
+    scheduler.frame()
+    rows.append("row 10")
+    scheduler.mark_dirty(widget)
+    scheduler.frame()
+    assert scheduler.stats.rendered == 1
+    widget.view.follow = True
+    widget.view.scroll_end()
+    scheduler.mark_dirty(widget)
+    scheduler.frame()
+    assert widget.view.render()[-1] == "row 10" and scheduler.stats.rendered == 2
+
+
+def test_run_coalesces_requests_into_rate_limited_frames() -> None:
+    async def scenario() -> tuple[int, int]:
+        screen = Screen()
+        scheduler = RefreshScheduler(screen, max_fps=20)
+        label = Label("0")
+        scheduler.mount(label, top=0, height=1)
+        task = asyncio.create_task(scheduler.run())
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for i in range(1, 201):
+            label.text = str(i)
+            scheduler.mark_dirty(label)
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(scheduler.interval * 2)
+        scheduler.stop()
+        await task
+        assert screen.writes[-1] == [(0, "200")]
+        return scheduler.stats.frames, round((loop.time() - start) / scheduler.interval)
+
+    frames, intervals = asyncio.run(scenario())
+    assert frames <= intervals + 1
+
+
+def test_max_fps_must_be_positive() -> None:
+    with pytest.raises(ValueError):
+        RefreshScheduler(Screen(), max_fps=0)
+
+
+def test_pump_applies_in_slices_and_blocks_producer_when_full() -> None:
+    applied: list[Sequence[int]] = []
+    producer_blocked = threading.Event()
+
+    async def scenario() -> IngestPump[int]:
+        pump: IngestPump[int] = IngestPump(applied.append, max_pending=2, slice_size=4)
+        batches = [list(range(i * 10, i * 10 + 10)) for i in range(5)]
+
+        def produce() -> None:
+            for batch in batches:
+                if pump.depth == 2:
+                    producer_blocked.set()
+                pump.submit(batch, loop)
+
+        loop = asyncio.get_running_loop()
+        producer = asyncio.create_task(asyncio.to_thread(produce))
+        # The consumer is not running yet: the producer fills the queue and waits.
+        while not producer_blocked.is_set():
+            await asyncio.sleep(0.001)
+        assert pump.depth == 2 and not producer.done()
+        consumer = asyncio.create_task(pump.run())
+        await producer
+        await pump.close()
+        await consumer
+        return pump
+
+    pump = asyncio.run(scenario())
+    assert [x for chunk in applied for x in chunk] == list(range(50))
+    assert max(len(chunk) for chunk in applied) == 4
+    assert pump.stats.max_depth == 2 and pump.stats.items == 50 and pump.stats.batches == 5
+
+
+def test_profile_panel_is_hidden_until_toggled() -> None:
+    source = Metrics()
+    panel = ProfilePanel(source)
+    scheduler = RefreshScheduler(Screen())
+    scheduler.mount(panel, top=0, height=8)
+    scheduler.frame()
+    assert panel.render() == [] and not source.enabled
+    assert panel.toggle() and source.enabled
+    source.record("render", 0.004, items=12)
+    scheduler.mark_dirty(panel)
+    scheduler.frame()
+    assert any(line.startswith("render") for line in panel.render())
+    assert not panel.toggle() and not source.enabled
@@ -0,0 +1,98 @@
+"""Scrolling, cursor and rendering behaviour of :class:`VirtualList`."""
+
+from __future__ import annotations
+
+from src.tui.virtual_list import HeightCache, VirtualList, wrap_text
+
+
+def _rows(count: int, tall_every: int = 0) -> list[str]:
+    # Every ``tall_every``-th row wraps onto three lines at width 10.
+    rows = [f"row {i:04d}" for i in range(count)]
+    return [" ".join([row] * 3) if tall_every and i % tall_every == 0 else row for i, row in enumerate(rows)]
+
+
+def test_wrap_text_splits_paragraphs_and_long_lines() -> None:
+    assert wrap_text("abcdefghij\n\nxy", 4) == ["abcd", "efgh", "ij", "", "xy"]
+    assert wrap_text("", 4) == [""]
+
+
+def test_height_cache_evicts_oldest_and_resets_on_width_change() -> None:
+    cache = HeightCache(capacity=2)
+    cache.set_width(10)
+    cache.put(0, 1)
+    cache.put(1, 2)
+    assert cache.get(0) == 1
+    cache.put(2, 3)
+    assert cache.get(1) is None and cache.get(0) == 1
+    cache.set_width(20)
+    assert len(cache) == 0
+
+
+def test_render_fills_viewport_and_only_touches_window() -> None:
+    seen: list[int] = []
+
+    def render(row: str, width: int) -> list[str]:
+        seen.append(int(row.split()[1]))
+        return wrap_text(row, width)
+
+    view = VirtualList(_rows(10_000), render, width=10, height=5, overscan=2)
+    assert view.render() == [f"row {i:04d}" for i in range(5)]
+    # Besides the window, only the rows that bound the end of the list are measured.
+    assert all(i < 5 + 2 or i >= 10_000 - 5 for i in seen)
+    view.scroll_to(5_000)
+    assert view.render()[0] == "row 5000"
+    assert all(i < 7 or 4_998 <= i < 5_007 or i >= 10_000 - 5 for i in seen)
+
+
+def test_scroll_by_walks_wrapped_rows_line_by_line() -> None:
+    view = VirtualList(_rows(20, tall_every=2), width=10, height=4)
+    assert view.render()[:3] == ["row 0000"] * 3
+    view.scroll_by(2)
+    assert (view.top, view.top_offset) == (0, 2)
+    view.scroll_by(2)
+    assert (view.top, view.top_offset) == (2, 0)
+    view.scroll_by(-3)
+    assert (view.top, view.top_offset) == (0, 1)
+    view.scroll_by(-10)
+    assert (view.top, view.top_offset) == (0, 0)
+
+
+def test_scrolling_is_clamped_to_the_last_row() -> None:
+    view = VirtualList(_rows(10), width=10, height=4)
+    view.scroll_by(100)
+    assert view.at_end and view.top == 6
+    view.scroll_to(9)
+    assert view.render() == [f"row {i:04d}" for i in range(6, 10)]
+    view.scroll_page(-1)
+    assert view.top == 3
+
+
+def test_cursor_is_kept_visible() -> None:
+    view = VirtualList(_rows(100), width=10, height=4)
+    view.move_cursor(5)
+    assert view.cursor == 5 and view.top == 2
+    view.set_cursor(1)
+    assert view.top == 1
+    view.move_cursor(1_000)
+    assert view.cursor == 99 and view.at_end
+
+
+def test_follow_stays_pinned_until_user_scrolls_away() -> None:
+    rows = _rows(10)
+    view = VirtualList(rows, width=10, height=4, follow=True)
+    assert view.top == 6
+    rows.extend(_rows(15)[10:])
+    view.refresh()
+    assert view.render()[-1] == "row 0014"
+    view.scroll_by(-2)
+    rows.extend(_rows(20)[15:])
+    view.refresh()
+    assert view.top == 9 and not view.at_end
+
+
+def test_resize_rewraps_rows() -> None:
+    view = VirtualList(_rows(4, tall_every=1), width=10, height=3)
+    assert view.row_height(0) == 3
+    view.resize(40, 3)
+    assert view.row_height(0) == 1
+    assert view.render()[0] == "row 0000 row 0000 row 0000"
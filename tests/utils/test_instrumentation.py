@@ -0,0 +1,142 @@
+"""Stage timers, gauges, JSON export and profile dumps of :mod:`src.utils.instrumentation`."""
+
+from __future__ import annotations
+
+import json
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from src.utils import instrumentation
+from src.utils.instrumentation import Metrics, ProfileDumper, format_report, peak_rss_bytes, rss_bytes
+
+
+def test_disabled_metrics_record_nothing_and_share_one_timer() -> None:
+    m = Metrics()
+    assert m.stage("parse") is m.stage("render")
+    with m.stage("parse", 10):
+        pass
+    m.record("parse", 1.0)
+    m.count("records")
+    m.gauge("queue.ingest", 3)
+    snapshot = m.snapshot()
+    assert snapshot["stages"] == {} and snapshot["counters"] == {} and snapshot["gauges"] == {}
+
+
+def test_stage_percentiles_and_throughput() -> None:
+    m = Metrics()
+    m.enable()
+    for ms in range(1, 101):
+        m.record("parse", ms / 1000, items=10)
+    with m.stage("render", 5):
+        pass
+    stages = m.snapshot()["stages"]
+    parse = stages["parse"]
+    assert (parse["count"], parse["items"]) == (100, 1000)
+    assert (parse["p50_ms"], parse["p99_ms"], parse["max_ms"]) == pytest.approx((50, 99, 100))
+    assert parse["items_per_s"] > 0
+    assert stages["render"]["count"] == 1 and stages["render"]["items"] == 5
+
+
+def test_gauges_counters_and_json_export() -> None:
+    m = Metrics()
+    m.enable()
+    for depth in (1, 5, 2):
+        m.gauge("queue.ingest", depth)
+    m.count("records", 7)
+    m.record("ingest", 0.002, items=7)
+    data = json.loads(m.to_json())
+    assert data["gauges"]["queue.ingest"] == {"last": 2, "max": 5}
+    assert data["counters"] == {"records": 7}
+    if sys.platform != "win32":
+        assert data["rss_bytes"] > 0 and data["peak_rss_bytes"] >= data["rss_bytes"] // 2
+    report = format_report(data)
+    assert any(line.startswith("ingest") for line in report)
+    assert any(line.startswith("queue.ingest") and "max 5" in line for line in report)
+    m.enable()
+    assert m.snapshot()["stages"] == {}
+
+
+def test_memory_readings_fall_back_to_zero_without_procfs_or_resource(monkeypatch: pytest.MonkeyPatch) -> None:
+    def no_procfs(path: str, *args: Any, **kwargs: Any) -> Any:
+        raise FileNotFoundError(path)
+
+    # What Windows offers: no /proc, no os.sysconf and no resource module.
+    monkeypatch.setattr(instrumentation, "open", no_procfs, raising=False)
+    monkeypatch.delattr(os, "sysconf", raising=False)
+    monkeypatch.setitem(sys.modules, "resource", None)
+    assert rss_bytes() == 0 and peak_rss_bytes() == 0
+
+
+def test_profile_dumper_writes_cpu_and_memory_captures(tmp_path: Path) -> None:
+    m = Metrics()
+    m.enable()
+    m.record("parse", 0.001)
+    was_tracing = tracemalloc.is_tracing()
+    with ProfileDumper(tmp_path / "dumps", m) as dumper:
+        sum(i * i for i in range(10_000))
+        written = dumper.dump()
+        # A second dump in the same second (say, SIGUSR1 just before exit) keeps the first.
+        again = dumper.dump()
+    assert {p.name for p in written}.isdisjoint(p.name for p in again)
+    assert tracemalloc.is_tracing() == was_tracing
+    assert sorted(p.name.split(".", 1)[1] for p in written) == ["json", "pstats", "tracemalloc", "tracemalloc.txt"]
+    assert all(p.exists() for p in written)
+    assert json.loads(written[0].read_text())["stages"]["parse"]["count"] == 1
+    assert pstats.Stats(str(written[1])).total_calls > 0
+
+
+class _TimedLock:
+    """A lock that fails instead of deadlocking when its holder tries to take it again."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> None:
+        if not self._lock.acquire(timeout=2):
+            raise AssertionError("lock still held")
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._lock.release()
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGUSR1"), reason="no SIGUSR1")
+def test_signal_dumps_outside_the_handler_while_metrics_are_locked(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    m = Metrics()
+    m.enable()
+    monkeypatch.setattr(m, "_lock", _TimedLock())
+    add = instrumentation.StageStats.add
+
+    def add_under_signals(stats: instrumentation.StageStats, seconds: float, items: int) -> None:
+        # record() holds the metrics lock here; a burst of signals must neither block nor recurse.
+        for _ in range(50):
+            os.kill(os.getpid(), signal.SIGUSR1)
+        add(stats, seconds, items)
+
+    monkeypatch.setattr(instrumentation.StageStats, "add", add_under_signals)
+    previous = signal.getsignal(signal.SIGUSR1)
+    dumper = ProfileDumper(tmp_path, m, memory=False)
+    dumper.start()
+    dumper.install_signal()
+    try:
+        m.record("parse", 0.001)
+        deadline = time.monotonic() + 5
+        while not list(tmp_path.glob("*.pstats")) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        dumper.stop()
+    assert signal.getsignal(signal.SIGUSR1) is previous
+    dumps = sorted(tmp_path.glob("*.json"))
+    assert 1 <= len(dumps) < 50
+    assert json.loads(dumps[0].read_text())["stages"]["parse"]["count"] == 1
+    assert pstats.Stats(str(next(tmp_path.glob("*.pstats")))).total_calls > 0